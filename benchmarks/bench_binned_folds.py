@@ -0,0 +1,127 @@
+"""
+Per-fold fit time and peak memory: copied X.iloc slices (model.fit) vs
+folds trained on subsets of one pre-binned matrix (src/binned.py).
+
+Each (model, mode) runs in a fresh interpreter. Fold peaks are the RSS
+high-water mark during that fold above the RSS once X was built, so the
+binned matrix kept between folds counts against the binned mode. The
+binned mode also reports the one-off build.
+
+Usage:
+    python -m benchmarks.bench_binned_folds --rows 500k --n-estimators 100
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+MODEL_TYPES = ["lightgbm", "xgboost", "catboost"]
+MODES = ["copy", "binned"]
+
+
+def run_one(model_name, mode, n_rows, n_estimators):
+    import gc
+    from sklearn.metrics import roc_auc_score
+    from src.binned import build_binned, fit_binned
+    from src.features import build_train_matrix
+    from src.models import get_model, positive_proba
+    from src.schema import apply_schema
+    from src.tracing import current_rss
+    from src.train import get_cv_splits
+    from .measure import peak_rss_bytes, reset_peak_rss
+    from .suite import _set_n_estimators
+    from .synthetic import make_patients
+
+    X, y, _ = build_train_matrix(apply_schema(make_patients(n_rows)))
+    splits = get_cv_splits(X, y)
+    model = _set_n_estimators(get_model(model_name, n_threads=1), model_name, n_estimators)
+    gc.collect()
+    base_rss = current_rss()
+
+    record = {"model": model_name, "mode": mode, "rows": n_rows, "folds": []}
+    binned = None
+    if mode == "binned":
+        reset_peak_rss()
+        start = time.perf_counter()
+        binned = build_binned(model_name, model, X, y)
+        record["build_s"] = round(time.perf_counter() - start, 3)
+        record["build_peak_mib"] = round((peak_rss_bytes() - base_rss) / 2**20, 1)
+        gc.collect()
+        record["held_mib"] = round((current_rss() - base_rss) / 2**20, 1)
+
+    for train_idx, val_idx in splits:
+        gc.collect()
+        reset_peak_rss()
+        start = time.perf_counter()
+        if binned is None:
+            model.fit(X.iloc[train_idx], y.iloc[train_idx])
+            fitted = model
+        else:
+            fitted = fit_binned(model_name, model, binned, train_idx)
+        seconds = time.perf_counter() - start
+        peak = peak_rss_bytes() - base_rss
+
+        auc = roc_auc_score(y.iloc[val_idx], positive_proba(fitted, X.iloc[val_idx]))
+        record["folds"].append({"fit_s": round(seconds, 3), "peak_mib": round(peak / 2**20, 1), "auc": round(auc, 5)})
+        del fitted
+
+    return record
+
+
+def main():
+    from .suite import parse_size
+
+    parser = argparse.ArgumentParser(description="Copied vs pre-binned CV folds")
+    parser.add_argument("--rows", default="200k")
+    parser.add_argument("--models", nargs="+", choices=MODEL_TYPES, default=MODEL_TYPES)
+    parser.add_argument("--n-estimators", type=int, default=100, help="Trees per model (0 = configured)")
+    parser.add_argument("--_run", nargs=2, metavar=("MODEL", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    n_rows = parse_size(args.rows)
+
+    if args._run:
+        print(json.dumps(run_one(*args._run, n_rows, args.n_estimators or None)))
+        return
+
+    print(f"{n_rows:,} rows, {args.n_estimators or 'configured'} trees, 1 thread per fit")
+    for model_name in args.models:
+        records = {}
+        for mode in MODES:
+            cmd = [sys.executable, "-m", "benchmarks.bench_binned_folds", "--rows", str(n_rows),
+                   "--n-estimators", str(args.n_estimators), "--_run", model_name, mode]
+            proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{model_name} {mode} FAILED\n{proc.stderr[-1500:]}")
+                continue
+            records[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+        if len(records) < len(MODES):
+            continue
+        copy, binned = records["copy"], records["binned"]
+        print(
+            f"\n{model_name}: binned build {binned['build_s']:.2f}s, peak +{binned['build_peak_mib']:.0f} MiB, "
+            f"holds {binned['held_mib']:.0f} MiB"
+        )
+        print(f"  {'fold':>4} {'copy s':>8} {'binned s':>9} {'copy MiB':>9} {'binned MiB':>11} {'copy auc':>9} {'binned auc':>11}")
+        for i, (c, b) in enumerate(zip(copy["folds"], binned["folds"]), 1):
+            print(
+                f"  {i:>4} {c['fit_s']:8.2f} {b['fit_s']:9.2f} {c['peak_mib']:9.1f} {b['peak_mib']:11.1f} "
+                f"{c['auc']:9.5f} {b['auc']:11.5f}"
+            )
+        total_copy = sum(f["fit_s"] for f in copy["folds"])
+        total_binned = binned["build_s"] + sum(f["fit_s"] for f in binned["folds"])
+        print(
+            f"  total {total_copy:.2f}s vs {total_binned:.2f}s (build included); "
+            f"mean fold AUC {np.mean([f['auc'] for f in copy['folds']]):.5f} vs "
+            f"{np.mean([f['auc'] for f in binned['folds']]):.5f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+evaluate_predictions (one sort, every threshold) vs the sklearn calls it
+replaced (roc_auc / average_precision / precision / recall / f1 at a single
+threshold). Checks that the metrics agree.
+
+Usage:
+    python -m benchmarks.bench_evaluate --rows 1m 10m
+"""
+
+import argparse
+
+import numpy as np
+from sklearn.metrics import roc_auc_score, average_precision_score, precision_score, recall_score, f1_score
+
+from src.config import DEFAULT_THRESHOLD
+from src.evaluate import evaluate_predictions
+from .measure import measure, mib
+from .suite import parse_size
+
+
+def evaluate_sklearn(y_true, probas, threshold=DEFAULT_THRESHOLD):
+    preds = (probas >= threshold).astype(int)
+    return {
+        "roc_auc": roc_auc_score(y_true, probas),
+        "pr_auc": average_precision_score(y_true, probas),
+        "precision": precision_score(y_true, preds),
+        "recall": recall_score(y_true, preds),
+        "f1": f1_score(y_true, preds),
+    }
+
+
+def run(n_rows: int, repeat: int):
+    rng = np.random.default_rng(0)
+    y = (rng.random(n_rows) < 0.6).astype(np.int8)
+    probas = np.clip(0.35 * y + 0.65 * rng.random(n_rows), 0, 1)
+
+    new, new_time, new_peak = measure(evaluate_predictions, y, probas, repeat=repeat)
+    old, old_time, old_peak = measure(evaluate_sklearn, y, probas, repeat=repeat)
+    diff = max(abs(new[k] - old[k]) for k in old)
+
+    print(f"\nrows={n_rows:,}")
+    print(f"  sklearn (1 threshold)  : {old_time:8.3f}s  peak {mib(old_peak):8.1f} MiB")
+    print(f"  sweep (all thresholds) : {new_time:8.3f}s  peak {mib(new_peak):8.1f} MiB")
+    print(f"  speedup : {old_time / new_time:8.2f}x  max metric diff {diff:.1e}")
+    print(f"  best threshold {new['best_threshold']:.5f} (f1 {new['best_f1']:.5f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OOF evaluation benchmark")
+    parser.add_argument("--rows", nargs="+", default=["1m", "10m"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.rows:
+        run(parse_size(size), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
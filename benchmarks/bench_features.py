@@ -0,0 +1,42 @@
+"""
+create_features (NumPy kernel) vs create_features_pandas (reference).
+
+Usage:
+    python -m benchmarks.bench_features --rows 700000 300000
+"""
+
+import argparse
+
+import pandas as pd
+
+from src.features import create_features, create_features_pandas
+from .measure import measure, mib
+from .synthetic import make_patients
+
+
+def run(n_rows: int, repeat: int):
+    df = make_patients(n_rows)
+
+    new, new_time, new_peak = measure(create_features, df, repeat=repeat)
+    old, old_time, old_peak = measure(create_features_pandas, df, repeat=repeat)
+
+    pd.testing.assert_frame_equal(new, old, check_exact=True)
+
+    print(f"\nrows={n_rows:,}")
+    print(f"  pandas  : {old_time:8.3f}s  peak {mib(old_peak):8.1f} MiB")
+    print(f"  kernel  : {new_time:8.3f}s  peak {mib(new_peak):8.1f} MiB")
+    print(f"  speedup : {old_time / new_time:8.2f}x  memory {old_peak / new_peak:5.2f}x less")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature engineering benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[700_000, 300_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        run(n_rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
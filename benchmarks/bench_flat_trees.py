@@ -0,0 +1,85 @@
+"""
+Flat NumPy tree ensemble vs the per-model library calls.
+
+Compiles the fold models in --model-dir (or synthetic ones with --train),
+checks the probabilities agree and times both paths per batch size. The
+flat ensemble is timed on float64 values and on quantized integer bins.
+
+Usage:
+    python -m benchmarks.bench_flat_trees --train --n-estimators 800
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.config import MODEL_DIR
+from src.flat_trees import compile_models
+from src.predictor import EnsemblePredictor
+from .synthetic import make_patients, train_synthetic_models
+
+
+def best_ms(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1e3
+
+
+def run(model_dir: Path, batch_sizes, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        flat_path = Path(tmp) / "flat_ensemble.npz"
+        start = time.perf_counter()
+        flat = compile_models(model_dir=model_dir, path=flat_path)
+        print(
+            f"compiled {flat.meta['n_trees']} trees / {flat.meta['n_nodes']} nodes "
+            f"in {time.perf_counter() - start:.2f}s ({flat_path.stat().st_size / 2**20:.1f} MiB)"
+        )
+        libs = EnsemblePredictor(model_dir=model_dir, cache_size=0)
+        flat = EnsemblePredictor(model_dir=model_dir, flat_path=flat_path, cache_size=0)
+
+    raw = make_patients(max(batch_sizes), seed=123, with_target=False)[libs.raw_columns]
+    raw = raw.to_numpy(dtype=np.float64)
+    def flat_float(r):
+        return flat.flat.predict_proba(flat.build_features(r), quantized=False)
+
+    def flat_quantized(r):
+        return flat.flat.predict_proba(flat.build_features(r), quantized=True)
+
+    diff = np.abs(libs.predict_proba(raw) - flat_float(raw)).max()
+    print(f"max |diff| vs library path: {diff:.3g}")
+    print(f"quantized == float64 flat: {np.array_equal(flat_quantized(raw), flat_float(raw))}")
+
+    print(f"  {'rows':>7} {'libraries':>12} {'flat':>12} {'quantized':>12}  (ms, best of {repeat})")
+    for n in batch_sizes:
+        print(
+            f"  {n:>7} {best_ms(libs.predict_proba, raw[:n], repeat):12.2f} "
+            f"{best_ms(flat_float, raw[:n], repeat):12.2f} "
+            f"{best_ms(flat_quantized, raw[:n], repeat):12.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat tree ensemble benchmark")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--train", action="store_true", help="Fit synthetic fold models first")
+    parser.add_argument("--n-estimators", type=int, default=None)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 1024])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.train:
+        with tempfile.TemporaryDirectory() as tmp:
+            train_synthetic_models(tmp, n_estimators=args.n_estimators)
+            run(Path(tmp), args.batch_sizes, args.repeat)
+    else:
+        run(args.model_dir, args.batch_sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Load time and RSS of the processed-stage formats (csv / npy / feather).
+
+Each load runs in a fresh interpreter so RSS is not shared between formats.
+"open" only opens the file; "features" also runs build_train_matrix, which
+touches every column.
+
+Usage:
+    python -m benchmarks.bench_formats --rows 700000
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from src.storage import save_processed_frame, _has_pyarrow
+from .measure import mib
+from .synthetic import make_patients
+
+LOAD_SCRIPT = """
+import json, sys, time
+from benchmarks.measure import peak_rss_bytes
+from src.storage import load_processed_frame
+from src.features import build_train_matrix
+
+csv_path, fmt, stage = sys.argv[1:4]
+base = peak_rss_bytes()
+start = time.perf_counter()
+df = load_processed_frame(csv_path, fmt)
+if stage == "features":
+    build_train_matrix(df)
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "rss": peak_rss_bytes() - base}))
+"""
+
+
+def load_in_subprocess(csv_path: Path, fmt: str, stage: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", LOAD_SCRIPT, str(csv_path), fmt, stage],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processed data format benchmark")
+    parser.add_argument("--rows", type=int, default=700_000)
+    args = parser.parse_args()
+
+    formats = ["csv", "npy"] + (["feather"] if _has_pyarrow() else [])
+    df = make_patients(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "train.csv"
+        for fmt in formats:
+            save_processed_frame(df, csv_path, fmt)
+
+        print(f"rows={args.rows:,}")
+        print(f"{'format':<8} {'stage':<9} {'seconds':>8} {'rss MiB':>8}")
+        for fmt in formats:
+            for stage in ("open", "features"):
+                res = load_in_subprocess(csv_path, fmt, stage)
+                print(f"{fmt:<8} {stage:<9} {res['seconds']:8.3f} {mib(res['rss']):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Single-patient latency: EnsemblePredictor vs the DataFrame path
+(pd.DataFrame -> build_test_matrix -> predict_with_models per model type).
+"cached" repeats the same records through the prediction cache, as with
+retried or re-polled payloads.
+
+Uses the fold models in --model-dir; with --train, fits synthetic fold
+models into a temporary directory first.
+
+Usage:
+    python -m benchmarks.bench_predictor --train --n-estimators 800
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import MODEL_DIR
+from src.ensemble import predict_ensemble
+from src.features import build_test_matrix
+from src.predictor import EnsemblePredictor
+from .synthetic import make_patients, train_synthetic_models
+
+
+def latencies(fn, records, repeat):
+    times = []
+    for _ in range(repeat):
+        for record in records:
+            start = time.perf_counter()
+            fn(record)
+            times.append(time.perf_counter() - start)
+    return np.array(times) * 1e3
+
+
+def report(label, ms):
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"  {label:<10} p50 {p50:7.3f}  p95 {p95:7.3f}  p99 {p99:7.3f}  (ms)")
+
+
+def run(model_dir: Path, n_records: int, repeat: int):
+    predictor = EnsemblePredictor(model_dir=model_dir, cache_size=0)
+    cached = EnsemblePredictor(model_dir=model_dir)
+    records = make_patients(n_records, seed=123, with_target=False)[predictor.raw_columns]
+    records = records.astype(float).to_dict(orient="records")
+
+    def dataframe_path(record):
+        X, _ = build_test_matrix(pd.DataFrame([record]))
+        return predict_ensemble(predictor.models, X[predictor.feature_names])[0]
+
+    fast = [predictor.predict_one(r) for r in records]
+    slow = [dataframe_path(r) for r in records]
+    print(f"max |diff| vs DataFrame path: {np.max(np.abs(np.subtract(fast, slow))):.3g}")
+
+    report("predictor", latencies(predictor.predict_one, records, repeat))
+    report("cached", latencies(cached.predict_one, records, repeat))
+    print(f"  cache: {cached.cache.stats()}")
+    report("dataframe", latencies(dataframe_path, records, repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online predictor latency benchmark")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--train", action="store_true", help="Fit synthetic fold models first")
+    parser.add_argument("--n-estimators", type=int, default=None)
+    parser.add_argument("--records", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.train:
+        with tempfile.TemporaryDirectory() as tmp:
+            train_synthetic_models(tmp, n_estimators=args.n_estimators)
+            run(Path(tmp), args.records, args.repeat)
+    else:
+        run(args.model_dir, args.records, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Fold model loading: one joblib.load per pickle (the old
+load_models_for_type loop) vs the registry in src/registry.py, cold
+(thread pool), warm (process cache) and after one pickle is rewritten.
+
+Each mode runs in a fresh interpreter with the model libraries already
+imported, so only loading is timed.
+
+Usage:
+    python -m benchmarks.bench_registry --model-dir artifacts/models
+    python -m benchmarks.bench_registry --rows 100k --n-estimators 800
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODEL_TYPES = ["lightgbm", "xgboost", "catboost"]
+
+
+def run_one(model_dir, threads):
+    import joblib
+    import catboost, lightgbm, xgboost  # noqa: F401  (import cost is not load cost)
+    from src.registry import load_models, fold_model_paths
+
+    model_dir = Path(model_dir)
+    record = {}
+
+    start = time.perf_counter()
+    for name in MODEL_TYPES:
+        [joblib.load(p) for p in fold_model_paths(name, model_dir)]
+    record["sequential_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    models = load_models(MODEL_TYPES, model_dir, threads=threads)
+    record["registry_cold_s"] = time.perf_counter() - start
+    record["n_models"] = sum(len(m) for m in models.values())
+
+    start = time.perf_counter()
+    load_models(MODEL_TYPES, model_dir, threads=threads)
+    record["registry_warm_s"] = time.perf_counter() - start
+
+    path = fold_model_paths(MODEL_TYPES[0], model_dir)[0]
+    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+    start = time.perf_counter()
+    load_models(MODEL_TYPES, model_dir, threads=threads)
+    record["registry_one_changed_s"] = time.perf_counter() - start
+    return record
+
+
+def main():
+    from .suite import parse_size
+    from .synthetic import train_synthetic_models
+
+    parser = argparse.ArgumentParser(description="Model registry load times")
+    parser.add_argument("--model-dir", help="Existing MODEL_DIR layout (default: train synthetic models)")
+    parser.add_argument("--rows", default="20k", help="Rows for the synthetic models")
+    parser.add_argument("--n-estimators", type=int, default=None)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--_run", nargs=2, metavar=("MODEL_DIR", "THREADS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._run:
+        print(json.dumps(run_one(args._run[0], int(args._run[1]))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = args.model_dir
+        if model_dir is None:
+            model_dir = tmp
+            train_synthetic_models(model_dir, parse_size(args.rows), args.n_estimators)
+
+        for threads in args.threads:
+            cmd = [sys.executable, "-m", "benchmarks.bench_registry", "--_run", str(model_dir), str(threads)]
+            proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"threads={threads} FAILED\n{proc.stderr[-1500:]}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(
+                f"{r['n_models']} models, {threads} threads: sequential {r['sequential_s']:.3f}s | "
+                f"registry cold {r['registry_cold_s']:.3f}s, warm {r['registry_warm_s'] * 1e3:.2f} ms, "
+                f"one changed {r['registry_one_changed_s']:.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Memory of N concurrent scoring workers (as with uvicorn --workers N):
+
+    baseline    imports the serving code, no models
+    pickles     EnsemblePredictor over the pickled fold models
+    flat-copy   compiled flat ensemble, arrays read into each worker
+    flat-mmap   compiled flat ensemble, memory-mapped read-only (shared)
+
+All N workers of a mode are alive at once, each having scored a batch.
+Reported per mode: summed RSS, summed PSS (shared pages split between the
+processes that map them, i.e. what the workers really cost together) and
+summed USS (private pages). "+worker" is the PSS added by each worker after
+the first.
+
+Usage:
+    python -m benchmarks.bench_serving_memory --workers 1 2 4
+    python -m benchmarks.bench_serving_memory --model-dir artifacts/models --workers 4
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODES = ["baseline", "pickles", "flat-copy", "flat-mmap"]
+
+
+def memory_of(pid):
+    """
+    {"rss", "pss", "uss"} bytes of a process, from /proc/<pid>/smaps_rollup.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def worker(mode, model_dir, flat_path):
+    from src.config import ENSEMBLE_WEIGHTS
+    from src.predictor import EnsemblePredictor
+    from .synthetic import make_patients
+
+    if mode != "baseline":
+        if mode == "pickles":
+            predictor = EnsemblePredictor(Path(model_dir), weights=ENSEMBLE_WEIGHTS)
+        else:
+            predictor = EnsemblePredictor(Path(model_dir), flat_path=Path(flat_path), flat_mmap=mode == "flat-mmap")
+        raw = make_patients(256, seed=1, with_target=False)[predictor.raw_columns].to_numpy(float)
+        predictor.predict_proba(raw)
+
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+
+def run_mode(mode, n_workers, model_dir, flat_path):
+    cmd = [sys.executable, "-m", "benchmarks.bench_serving_memory", "--_worker", mode, str(model_dir), str(flat_path)]
+    procs = [
+        subprocess.Popen(cmd, cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(n_workers)
+    ]
+    try:
+        for proc in procs:
+            if proc.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"{mode} worker failed")
+        usage = [memory_of(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return {key: sum(u[key] for u in usage) for key in ("rss", "pss", "uss")}
+
+
+def main():
+    from .suite import parse_size
+    from .synthetic import train_synthetic_models
+
+    parser = argparse.ArgumentParser(description="Per-worker serving memory")
+    parser.add_argument("--model-dir", help="Existing MODEL_DIR layout (default: train synthetic models)")
+    parser.add_argument("--rows", default="20k", help="Rows for the synthetic models")
+    parser.add_argument("--n-estimators", type=int, default=None)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--_worker", nargs=3, metavar=("MODE", "MODEL_DIR", "FLAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._worker:
+        worker(*args._worker)
+        return
+
+    from src.config import ENSEMBLE_WEIGHTS
+    from src.flat_trees import compile_models
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = Path(args.model_dir or tmp)
+        if args.model_dir is None:
+            train_synthetic_models(model_dir, parse_size(args.rows), args.n_estimators)
+        flat_path = Path(tmp) / "flat_ensemble.npz"
+        compile_models(model_dir, weights=ENSEMBLE_WEIGHTS, path=flat_path)
+
+        results = {}
+        for mode in MODES:
+            for n in args.workers:
+                results[mode, n] = run_mode(mode, n, model_dir, flat_path)
+
+        print(f"{'mode':<10} {'workers':>7} {'RSS MiB':>9} {'PSS MiB':>9} {'USS MiB':>9} {'+worker':>9}")
+        for (mode, n), r in results.items():
+            first = results[mode, args.workers[0]]
+            extra = (r["pss"] - first["pss"]) / max(n - args.workers[0], 1) / 2**20 if n > args.workers[0] else float("nan")
+            print(
+                f"{mode:<10} {n:>7} {r['rss'] / 2**20:9.1f} {r['pss'] / 2**20:9.1f} "
+                f"{r['uss'] / 2**20:9.1f} {extra:9.1f}"
+            )
+        print(json.dumps({f"{m}:{n}": r for (m, n), r in results.items()}))
+
+
+if __name__ == "__main__":
+    main()
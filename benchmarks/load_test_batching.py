@@ -0,0 +1,97 @@
+"""
+Load test for MicroBatcher: throughput and latency across batch settings.
+
+Each of --clients coroutines sends --requests single-patient requests back
+to back. "unbatched" scores every request on its own (predict_one in a
+worker thread); the other rows go through MicroBatcher.
+
+Usage:
+    python -m benchmarks.load_test_batching --train --clients 64
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.batching import MicroBatcher
+from src.config import MODEL_DIR
+from src.predictor import EnsemblePredictor
+from .synthetic import make_patients, train_synthetic_models
+
+
+async def drive(predict, records, n_clients, n_requests):
+    latencies = []
+
+    async def client(offset):
+        for i in range(n_requests):
+            record = records[(offset + i) % len(records)]
+            start = time.perf_counter()
+            await predict(record)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(n_clients)))
+    return time.perf_counter() - start, np.array(latencies) * 1e3
+
+
+async def run_setting(predictor, records, args, batch_size, wait_ms):
+    if batch_size is None:
+        loop = asyncio.get_running_loop()
+
+        async def predict(record):
+            return await loop.run_in_executor(None, predictor.predict_one, record)
+
+        elapsed, ms = await drive(predict, records, args.clients, args.requests)
+        label, mean_batch = "unbatched", 1.0
+    else:
+        batcher = MicroBatcher(predictor, max_batch_size=batch_size, max_wait_ms=wait_ms)
+        await batcher.start()
+        elapsed, ms = await drive(batcher.predict, records, args.clients, args.requests)
+        await batcher.stop()
+        label, mean_batch = f"{batch_size}/{wait_ms}ms", batcher.rows / max(batcher.batches, 1)
+
+    p50, p99 = np.percentile(ms, [50, 99])
+    print(
+        f"{label:<14} {len(ms) / elapsed:10.1f} req/s  "
+        f"p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  mean batch {mean_batch:6.1f}"
+    )
+
+
+async def run(model_dir, args):
+    # requests repeat the same 256 records; measure scoring, not cache hits
+    predictor = EnsemblePredictor(model_dir=model_dir, cache_size=0)
+    records = make_patients(256, seed=123, with_target=False)[predictor.raw_columns]
+    records = records.astype(float).to_dict(orient="records")
+
+    print(f"clients={args.clients} requests/client={args.requests}")
+    await run_setting(predictor, records, args, None, None)
+    for batch_size in args.batch_sizes:
+        for wait_ms in args.waits_ms:
+            await run_setting(predictor, records, args, batch_size, wait_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching load test")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--train", action="store_true", help="Fit synthetic fold models first")
+    parser.add_argument("--n-estimators", type=int, default=None)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--waits-ms", type=float, nargs="+", default=[1.0, 5.0])
+    args = parser.parse_args()
+
+    if args.train:
+        with tempfile.TemporaryDirectory() as tmp:
+            train_synthetic_models(tmp, n_estimators=args.n_estimators)
+            asyncio.run(run(Path(tmp), args))
+    else:
+        asyncio.run(run(args.model_dir, args))
+
+
+if __name__ == "__main__":
+    main()
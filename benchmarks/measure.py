@@ -0,0 +1,68 @@
+"""
+Timing and peak-memory helpers shared by the benchmark scripts.
+"""
+
+import gc
+import time
+import tracemalloc
+
+
+def measure(fn, *args, repeat: int = 3, **kwargs):
+    """
+        Runs fn(*args, **kwargs) `repeat` times.
+        Returns (last result, best wall seconds, peak traced bytes).
+        numpy and pandas buffers are reported to tracemalloc, so the peak
+        covers the arrays a call allocates on top of its inputs.
+    """
+    best = float("inf")
+    peak = 0
+    result = None
+
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return result, best, peak
+
+
+def mib(n_bytes) -> float:
+    return n_bytes / (1024 * 1024)
+
+
+def peak_rss_bytes() -> int:
+    """
+        Peak resident set size of the current process. Uses VmHWM on Linux,
+        since ru_maxrss is inherited from the parent across fork.
+    """
+    import resource
+    import sys
+
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+        Resets this process's VmHWM to its current RSS (Linux only), so a
+        later peak_rss_bytes() covers just the code run in between.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
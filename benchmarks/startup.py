@@ -0,0 +1,94 @@
+"""
+Startup report and time budget for the CLI.
+
+Runs a command under `python -X importtime` in a fresh interpreter, prints
+the slowest top-level imports and fails (exit status 1) if the best wall
+time exceeds --budget or a --forbid module gets imported.
+tests/test_startup.py runs the same checks under pytest.
+
+Usage:
+    python -m benchmarks.startup                      # src.main --help
+    python -m benchmarks.startup --budget 0.5 --top 20
+    python -m benchmarks.startup --module src.predictor --args= --no-forbid
+"""
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Libraries `src.main --help` must not pull in
+HEAVY_MODULES = ["pandas", "sklearn", "lightgbm", "xgboost", "catboost", "torch", "joblib"]
+
+
+def run_importtime(module: str, args):
+    """
+    One cold run. Returns (wall seconds, [(cumulative us, self us, depth, name)]).
+    """
+    cmd = [sys.executable, "-X", "importtime", "-m", module, *args]
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"{' '.join(cmd)} failed:\n{proc.stderr[-2000:]}")
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return wall, imports
+
+
+def report(imports, top: int):
+    roots = sorted((i for i in imports if i[2] == 0), reverse=True)
+    total = sum(i[0] for i in roots)
+    print(f"  {len(imports)} modules imported, {total / 1e3:.1f} ms in imports")
+    print(f"  {'cumulative':>12} {'self':>10}  top-level import")
+    for cumulative, self_us, _, name in roots[:top]:
+        print(f"  {cumulative / 1e3:10.1f}ms {self_us / 1e3:8.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup report / budget check")
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--args", default="--help", help="Arguments passed to the module")
+    parser.add_argument("--runs", type=int, default=5, help="Best of this many cold starts")
+    parser.add_argument("--budget", type=float, default=1.0, help="Wall time budget in seconds")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", nargs="*", default=HEAVY_MODULES)
+    parser.add_argument("--no-forbid", dest="forbid", action="store_const", const=[])
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module, shlex.split(args.args)) for _ in range(args.runs)]
+    best_wall, imports = min(runs, key=lambda r: r[0])
+
+    print(f"python -m {args.module} {args.args}")
+    print(f"  best wall time {best_wall:.3f}s of {args.runs} runs (budget {args.budget:.3f}s)")
+    report(imports, args.top)
+
+    loaded = {name.split(".")[0] for _, _, _, name in imports}
+    leaked = sorted(loaded.intersection(args.forbid))
+
+    failed = False
+    if leaked:
+        print(f"FAIL: imported {', '.join(leaked)}")
+        failed = True
+    if best_wall > args.budget:
+        print(f"FAIL: startup {best_wall:.3f}s exceeds budget {args.budget:.3f}s")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
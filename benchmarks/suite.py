@@ -0,0 +1,291 @@
+"""
+Benchmark suite for the training and scoring hot paths.
+
+Cases (each on synthetic data with the test_api.py schema):
+    create_features         raw frame -> features
+    build_train_matrix      raw frame -> X, y
+    cv_fold:<model>         one fold of cross_validate_model (fit + predict + save)
+    predict:<model>         predict_with_models over that model's fold models
+    run_ensemble            in-memory run_ensemble (feature cache off)
+
+Every (case, size) runs in a fresh interpreter, so peak memory is the
+RSS high-water mark of that call alone. Results are written as JSON;
+`compare` flags cases slower or hungrier than a baseline.
+
+Usage:
+    python -m benchmarks.suite run --sizes 10k 100k 1m 5m --output benchmarks/results/run.json
+    python -m benchmarks.suite run --sizes 100k --cases create_features run_ensemble --baseline benchmarks/results/baseline.json
+    python -m benchmarks.suite compare benchmarks/results/baseline.json benchmarks/results/run.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+MODEL_TYPES = ["lightgbm", "xgboost", "catboost"]
+CASES = (
+    ["create_features", "build_train_matrix"]
+    + [f"cv_fold:{m}" for m in MODEL_TYPES]
+    + [f"predict:{m}" for m in MODEL_TYPES]
+    + ["run_ensemble"]
+)
+DEFAULT_SIZES = ["10k", "100k", "1m", "5m"]
+
+
+def parse_size(text: str) -> int:
+    text = text.lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def _set_n_estimators(model, model_name, n_estimators):
+    if n_estimators:
+        key = "iterations" if model_name == "catboost" else "n_estimators"
+        model.set_params(**{key: n_estimators})
+    return model
+
+
+def setup_case(case: str, n_rows: int, model_dir: Path, work_dir: Path, n_estimators):
+    """
+    Builds the inputs for one case and returns (fn, rows processed per call).
+    """
+    from src.features import create_features, build_train_matrix, build_test_matrix
+    from .synthetic import make_patients
+
+    if case == "create_features":
+        df = make_patients(n_rows)
+        return lambda: create_features(df), n_rows
+
+    if case == "build_train_matrix":
+        df = make_patients(n_rows)
+        return lambda: build_train_matrix(df), n_rows
+
+    if case.startswith("cv_fold:"):
+        from src.models import get_model
+        from src.train import fit_fold, get_cv_splits
+
+        model_name = case.split(":", 1)[1]
+        X, y, _ = build_train_matrix(make_patients(n_rows))
+        train_idx, val_idx = get_cv_splits(X, y)[0]
+
+        def one_fold():
+            model = _set_n_estimators(get_model(model_name), model_name, n_estimators)
+            return fit_fold(model_name, 1, model, X, y, train_idx, val_idx, model_dir=work_dir)
+
+        return one_fold, len(train_idx)
+
+    if case.startswith("predict:"):
+        from src.ensemble import load_models_for_type, predict_with_models
+
+        model_name = case.split(":", 1)[1]
+        models = load_models_for_type(model_name, model_dir)
+        X, _ = build_test_matrix(make_patients(n_rows, seed=1, with_target=False))
+        return lambda: predict_with_models(models, X), n_rows
+
+    if case == "run_ensemble":
+        from src import feature_cache
+        from src.ensemble import run_ensemble, load_ensemble_models
+        from src.storage import save_processed_frame
+
+        feature_cache.FEATURE_CACHE_ENABLED = False  # time the full load + build + score
+        load_ensemble_models(model_dir)  # import the model libraries outside the timed call
+        test_file = work_dir / "test.csv"
+        save_processed_frame(make_patients(n_rows, seed=1, with_target=False), test_file)
+        return lambda: run_ensemble(model_dir=model_dir, test_file=test_file, submission_dir=work_dir), n_rows
+
+    raise SystemExit(f"Unknown case {case}; choose from {', '.join(CASES)}")
+
+
+def run_case(case, n_rows, model_dir, repeat, n_estimators):
+    """
+    Runs one case in this process and returns its result record.
+    """
+    import gc
+    from .measure import peak_rss_bytes, reset_peak_rss
+    from src.tracing import current_rss
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fn, rows = setup_case(case, n_rows, Path(model_dir), Path(tmp), n_estimators)
+
+        gc.collect()
+        rss_before = current_rss()
+        exact_peak = reset_peak_rss()
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+
+        peak = peak_rss_bytes()
+
+    best = min(times)
+    return {
+        "case": case,
+        "rows": n_rows,
+        "seconds": round(best, 6),
+        "seconds_median": round(sorted(times)[len(times) // 2], 6),
+        "rows_per_s": round(rows / best, 1),
+        # High-water mark above the RSS before the first call; without
+        # clear_refs (non-Linux) it is the process peak, setup included.
+        "peak_mib": round((peak - (rss_before if exact_peak else 0)) / 2**20, 1),
+    }
+
+
+def environment():
+    import numpy, pandas
+
+    info = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+    }
+    try:
+        info["commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        pass
+    return info
+
+
+def run_suite(args):
+    sizes = [parse_size(s) for s in args.sizes]
+    cases = args.cases or CASES
+    output = Path(args.output or RESULTS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = args.model_dir
+        if model_dir is None and any(c.startswith(("predict:", "run_ensemble")) for c in cases):
+            from .synthetic import train_synthetic_models
+
+            print(f"Fitting synthetic fold models ({args.n_estimators or 'configured'} trees)...")
+            model_dir = Path(tmp) / "models"
+            train_synthetic_models(model_dir, n_estimators=args.n_estimators or None)
+
+        results = []
+        for n_rows in sizes:
+            for case in cases:
+                cmd = [
+                    sys.executable, "-m", "benchmarks.suite", "_case", case, str(n_rows),
+                    "--repeat", str(args.repeat), "--model-dir", str(model_dir or tmp),
+                ]
+                if args.n_estimators:
+                    cmd += ["--n-estimators", str(args.n_estimators)]
+
+                proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+                if proc.returncode != 0:
+                    print(f"  {case:<22} {n_rows:>10,}  FAILED\n{proc.stderr[-1500:]}")
+                    continue
+
+                record = json.loads(proc.stdout.strip().splitlines()[-1])
+                results.append(record)
+                print(
+                    f"  {case:<22} {n_rows:>10,}  {record['seconds']:9.3f}s "
+                    f"{record['rows_per_s']:>14,.0f} rows/s  {record['peak_mib']:9.1f} MiB"
+                )
+
+    report = {
+        "environment": environment(),
+        "settings": {"repeat": args.repeat, "n_estimators": args.n_estimators},
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved -> {output}")
+
+    if args.baseline:
+        return compare(args.baseline, output, args.threshold, args.memory_threshold)
+    return 0
+
+
+def compare(baseline_path, candidate_path, threshold, memory_threshold):
+    """
+    Prints old vs new per (case, rows); returns 1 if anything regressed.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["case"], r["rows"]): r for r in json.load(f)["results"]}
+    with open(candidate_path) as f:
+        candidate = json.load(f)["results"]
+
+    print(f"{'case':<22} {'rows':>10} {'old s':>9} {'new s':>9} {'time':>7} {'old MiB':>9} {'new MiB':>9} {'mem':>7}")
+    regressions = 0
+    for new in candidate:
+        old = baseline.get((new["case"], new["rows"]))
+        if old is None:
+            print(f"{new['case']:<22} {new['rows']:>10,}  (not in baseline)")
+            continue
+
+        time_ratio = new["seconds"] / old["seconds"]
+        mem_ratio = new["peak_mib"] / old["peak_mib"] if old["peak_mib"] > 0 else 1.0
+        flags = []
+        if time_ratio > 1 + threshold:
+            flags.append("slower")
+        if mem_ratio > 1 + memory_threshold:
+            flags.append("more memory")
+        regressions += bool(flags)
+
+        print(
+            f"{new['case']:<22} {new['rows']:>10,} {old['seconds']:9.3f} {new['seconds']:9.3f} "
+            f"{time_ratio:6.2f}x {old['peak_mib']:9.1f} {new['peak_mib']:9.1f} {mem_ratio:6.2f}x"
+            + (f"  <-- {', '.join(flags)}" if flags else "")
+        )
+
+    print(f"{regressions} regression(s) beyond +{threshold:.0%} time / +{memory_threshold:.0%} memory")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training / scoring benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the suite and save results as JSON")
+    run.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="Row counts, e.g. 10k 1m")
+    run.add_argument("--cases", nargs="+", choices=CASES, default=None)
+    run.add_argument("--repeat", type=int, default=3, help="Timed calls per case (best is reported)")
+    run.add_argument("--n-estimators", type=int, default=100, help="Trees per model (0 = configured)")
+    run.add_argument("--model-dir", type=Path, default=None, help="Fold models for predict/run_ensemble")
+    run.add_argument("--output", type=Path, default=None)
+    run.add_argument("--baseline", type=Path, default=None, help="Compare against this result file")
+    run.add_argument("--threshold", type=float, default=0.15)
+    run.add_argument("--memory-threshold", type=float, default=0.15)
+
+    cmp = sub.add_parser("compare", help="Flag regressions against a baseline")
+    cmp.add_argument("baseline", type=Path)
+    cmp.add_argument("candidate", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.15, help="Allowed relative slowdown")
+    cmp.add_argument("--memory-threshold", type=float, default=0.15, help="Allowed relative peak growth")
+
+    case = sub.add_parser("_case")  # internal: one case in a fresh process
+    case.add_argument("case")
+    case.add_argument("rows", type=int)
+    case.add_argument("--repeat", type=int, default=3)
+    case.add_argument("--model-dir", type=Path)
+    case.add_argument("--n-estimators", type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(run_suite(args))
+    if args.command == "compare":
+        sys.exit(compare(args.baseline, args.candidate, args.threshold, args.memory_threshold))
+
+    record = run_case(args.case, args.rows, args.model_dir, args.repeat, args.n_estimators)
+    print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
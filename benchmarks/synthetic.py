@@ -0,0 +1,84 @@
+"""
+Synthetic patient data with the 17-field schema used by test_api.py.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.config import SEED, TARGET_COL
+
+
+def make_patients(n_rows: int, seed: int = SEED, with_target: bool = True) -> pd.DataFrame:
+    """
+        Returns a frame shaped like the processed train/test files:
+        an id column, the 17 patient fields and (optionally) the target.
+    """
+    rng = np.random.default_rng(seed)
+
+    age = rng.integers(18, 90, n_rows)
+    bmi = np.round(rng.normal(27.5, 4.5, n_rows).clip(15, 55), 1)
+    systolic = rng.integers(90, 180, n_rows)
+    hdl = rng.integers(25, 95, n_rows)
+    activity = np.round(rng.gamma(2.0, 1.5, n_rows), 1)
+    family = rng.integers(0, 2, n_rows)
+
+    df = pd.DataFrame({
+        "id": np.arange(n_rows),
+        "age": age,
+        "gender": rng.integers(0, 2, n_rows),
+        "bmi": bmi,
+        "waist_to_hip_ratio": np.round(rng.normal(0.86, 0.05, n_rows), 2),
+        "systolic_bp": systolic,
+        "diastolic_bp": (systolic * 0.6 + rng.integers(-10, 15, n_rows)).astype(np.int64),
+        "heart_rate": rng.integers(50, 110, n_rows),
+        "cholesterol": rng.integers(120, 320, n_rows),
+        "ldl": rng.integers(50, 220, n_rows),
+        "hdl": hdl,
+        "triglycerides": rng.integers(40, 400, n_rows),
+        "physical_activity": activity,
+        "screen_time": np.round(rng.uniform(0.5, 12.0, n_rows), 1),
+        "sleep_duration": np.round(rng.normal(7.0, 1.0, n_rows).clip(3, 11), 1),
+        "hypertension_history": rng.integers(0, 2, n_rows),
+        "cardiovascular_history": (rng.random(n_rows) < 0.1).astype(np.int64),
+        "family_history": family,
+    })
+
+    if with_target:
+        logit = (
+            0.04 * (age - 50) + 0.08 * (bmi - 27) + 0.9 * family
+            - 0.25 * activity + 0.01 * (systolic - 120) - 0.01 * (hdl - 55)
+        )
+        prob = 1.0 / (1.0 + np.exp(-logit))
+        df[TARGET_COL] = (rng.random(n_rows) < prob).astype(np.int64)
+
+    return df
+
+
+def train_synthetic_models(model_dir, n_rows: int = 20_000, n_estimators=None):
+    """
+        Fits CV fold models on synthetic data into model_dir/<model>/,
+        laid out like MODEL_DIR. n_estimators overrides the configured
+        tree count to keep quick runs short.
+    """
+    import joblib
+    from pathlib import Path
+
+    from src.features import build_train_matrix
+    from src.models import get_model
+    from src.train import get_cv_splits
+    from src.config import MODEL_NAMES
+
+    X, y, _ = build_train_matrix(make_patients(n_rows))
+    splits = get_cv_splits(X, y)
+
+    for model_name in MODEL_NAMES.values():
+        path = Path(model_dir) / model_name
+        path.mkdir(parents=True, exist_ok=True)
+
+        for fold, (train_idx, _) in enumerate(splits, 1):
+            model = get_model(model_name)
+            if n_estimators is not None:
+                key = "iterations" if model_name == MODEL_NAMES["cat"] else "n_estimators"
+                model.set_params(**{key: n_estimators})
+            model.fit(X.iloc[train_idx], y.iloc[train_idx])
+            joblib.dump(model, path / f"{model_name}_fold{fold}.pkl")
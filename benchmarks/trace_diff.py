@@ -0,0 +1,78 @@
+"""
+Diff two pipeline traces written by src.tracing (LOG_DIR/trace_*.json).
+
+Spans are matched by path; repeated spans (folds run in parallel, streamed
+chunks) are summed. Paths that got slower than --threshold or grew their
+peak RSS by more than --rss-threshold are flagged, and the exit status is 1
+when any are.
+
+Usage:
+    python -m benchmarks.trace_diff artifacts/logs/trace_A.json artifacts/logs/trace_B.json
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+
+def summarize(path):
+    with open(path) as f:
+        trace = json.load(f)
+
+    spans = defaultdict(lambda: {"duration": 0.0, "cpu": 0.0, "rss_peak": 0, "count": 0})
+    for record in trace["spans"]:
+        s = spans[record["path"]]
+        s["duration"] += record["duration"]
+        s["cpu"] += record.get("cpu", 0.0)
+        s["rss_peak"] = max(s["rss_peak"], record.get("rss_peak") or 0)
+        s["count"] += 1
+    return trace, spans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two pipeline traces")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Flag when new/old time exceeds this")
+    parser.add_argument("--rss-threshold", type=float, default=1.2, help="Flag when new/old peak RSS exceeds this")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Ignore spans faster than this")
+    args = parser.parse_args()
+
+    old_trace, old = summarize(args.baseline)
+    new_trace, new = summarize(args.candidate)
+
+    print(f"baseline  {old_trace['run_id']}  {old_trace['duration']:.2f}s  peak {old_trace['peak_rss'] / 2**20:.0f} MiB")
+    print(f"candidate {new_trace['run_id']}  {new_trace['duration']:.2f}s  peak {new_trace['peak_rss'] / 2**20:.0f} MiB")
+    print(f"{'span':<44} {'old s':>9} {'new s':>9} {'ratio':>7} {'old MiB':>8} {'new MiB':>8}")
+
+    regressions = []
+    for path in sorted(set(old) | set(new), key=lambda p: -new.get(p, old.get(p))["duration"]):
+        if path not in old or path not in new:
+            side = "new" if path not in old else "removed"
+            print(f"{path:<44} ({side})")
+            continue
+
+        o, n = old[path], new[path]
+        if max(o["duration"], n["duration"]) < args.min_seconds:
+            continue
+
+        ratio = n["duration"] / o["duration"] if o["duration"] else float("inf")
+        rss_ratio = n["rss_peak"] / o["rss_peak"] if o["rss_peak"] else 1.0
+        flag = ""
+        if ratio > args.threshold or rss_ratio > args.rss_threshold:
+            flag = "  <-- regression"
+            regressions.append(path)
+
+        print(
+            f"{path:<44} {o['duration']:9.3f} {n['duration']:9.3f} {ratio:7.2f} "
+            f"{o['rss_peak'] / 2**20:8.0f} {n['rss_peak'] / 2**20:8.0f}{flag}"
+        )
+
+    if regressions:
+        print(f"{len(regressions)} span(s) regressed")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# src/batching.py
+
+import asyncio
+import logging
+import numpy as np
+from src.exception import CustomException
+import sys
+
+from .config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-row requests and scores them in one
+    vectorized EnsemblePredictor.predict_proba call.
+
+    A batch is flushed once max_batch_size rows are queued or the first row
+    has waited max_wait_ms. Scoring runs in a worker thread so the event
+    loop keeps accepting requests while a batch is in flight.
+
+        batcher = MicroBatcher(EnsemblePredictor())
+        await batcher.start()
+        proba = await batcher.predict(record)
+        await batcher.stop()
+    """
+
+    def __init__(self, predictor, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = None
+        self._worker = None
+        self._batch = []  # rows taken off the queue and not resolved yet
+        self.batches = 0
+        self.rows = 0
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the worker and cancels every request still waiting, both the
+        batch being collected or scored and the rows left in the queue.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+            pending = self._batch
+            self._batch = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for _, future in pending:
+                future.cancel()
+            if pending:
+                logger.info(f"Cancelled {len(pending)} pending request(s) on stop")
+
+    async def predict(self, record: dict) -> float:
+        """
+        Probability for one patient record; resolves when its batch is scored.
+        """
+        if self._worker is None:
+            raise CustomException("MicroBatcher.start() has not been awaited", sys)
+
+        # Validate here so a bad record fails its own caller, not the batch
+        row = self.predictor.record_to_array(record)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        # collected straight into self._batch so stop() sees every row
+        batch = self._batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            rows = np.stack([row for row, _ in batch])
+
+            try:
+                probas = await loop.run_in_executor(None, self.predictor.predict_proba, rows)
+            except Exception as e:
+                logger.exception("Batch scoring failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._batch = []
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), proba in zip(batch, probas):
+                if not future.done():
+                    future.set_result(float(proba))
+            self._batch = []
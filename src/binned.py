@@ -0,0 +1,179 @@
+# src/binned.py
+
+import logging
+import numpy as np
+from src.exception import CustomException
+import sys
+
+from .config import MODEL_NAMES, EARLY_STOPPING_ROUNDS
+
+logger = logging.getLogger(__name__)
+
+# Rows per block when a fold's rows are fed to XGBoost
+SUBSET_BLOCK_ROWS = 65_536
+
+
+# The CV loop builds one binned matrix per model type with build_binned and
+# trains every fold on a row subset of it with fit_binned:
+#   LightGBM  constructed Dataset           -> Dataset.subset(train_idx)
+#   XGBoost   QuantileDMatrix (cuts only)   -> per-fold QuantileDMatrix(ref=...)
+#             fed block by block, so the fold is never copied as floats
+#   CatBoost  quantized Pool                -> Pool.slice(train_idx)
+# Bin borders come from all rows once, instead of from each fold's training
+# rows, so a fold's validation rows take part in choosing the borders it is
+# trained with; scores are close to, but not the same as, per-fold binning
+# (hence TRAIN_REUSE_BINS is opt-in). The validation rows, binned the same
+# way, drive early stopping. XGBoost and CatBoost folds come back as the usual sklearn
+# estimators; LightGBM folds as the trained lgb.Booster itself, which
+# pickles and predicts probabilities (see models.positive_proba).
+
+
+def lightgbm_params(model):
+    """
+    Booster params and round count of an LGBMClassifier.
+    """
+    params = model.get_params()
+    n_estimators = params.pop("n_estimators")
+    for key in ("class_weight", "importance_type"):  # sklearn wrapper only
+        params.pop(key, None)
+    params.setdefault("verbose", -1)
+    return params, n_estimators
+
+
+def xgboost_params(model):
+    """
+    Booster params and round count of an XGBClassifier.
+    """
+    params = model.get_xgb_params()
+    params.setdefault("max_bin", 256)
+    return params, model.get_params()["n_estimators"]
+
+
+def xgboost_classifier(booster, params):
+    """
+    Loads a trained Booster into an XGBClassifier.
+    """
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier(**{k: v for k, v in params.items() if k != "max_bin"})
+    model.load_model(bytearray(booster.save_raw("ubj")))
+    return model
+
+
+def _rows(X, idx):
+    return X.iloc[idx] if hasattr(X, "iloc") else X[idx]
+
+
+# LIGHTGBM
+
+def _build_lightgbm(model, X, y):
+    import lightgbm as lgb
+
+    params, _ = lightgbm_params(model)
+    return lgb.Dataset(X, label=y, params=params, free_raw_data=True).construct()
+
+
+def _fit_lightgbm(model, dataset, train_idx, val_idx, rounds):
+    import lightgbm as lgb
+
+    params, n_estimators = lightgbm_params(model)
+    kwargs = {}
+    if rounds:
+        params["metric"] = "auc"
+        kwargs = {
+            "valid_sets": [dataset.subset(np.asarray(val_idx))],
+            "callbacks": [lgb.early_stopping(rounds, verbose=False)],
+        }
+    return lgb.train(params, dataset.subset(np.asarray(train_idx)), num_boost_round=n_estimators, **kwargs)
+
+
+# XGBOOST
+
+def _build_xgboost(model, X, y):
+    import xgboost as xgb
+
+    params, _ = xgboost_params(model)
+    ref = xgb.QuantileDMatrix(X, y, max_bin=params["max_bin"], nthread=params.get("n_jobs"))
+    return {"X": X, "y": y, "ref": ref}
+
+
+def _fit_xgboost(model, binned, train_idx, val_idx, rounds):
+    import xgboost as xgb
+
+    params, n_estimators = xgboost_params(model)
+    X, y = binned["X"], np.asarray(binned["y"])
+
+    class FoldRows(xgb.DataIter):
+        def __init__(self, idx):
+            self._idx = idx
+            self._start = 0
+            super().__init__()
+
+        def next(self, input_data):
+            if self._start >= len(self._idx):
+                return False
+            block = self._idx[self._start:self._start + SUBSET_BLOCK_ROWS]
+            self._start += len(block)
+            input_data(data=_rows(X, block), label=y[block])
+            return True
+
+        def reset(self):
+            self._start = 0
+
+    def quantized(idx, ref):
+        return xgb.QuantileDMatrix(FoldRows(idx), ref=ref, max_bin=params["max_bin"], nthread=params.get("n_jobs"))
+
+    dtrain = quantized(train_idx, binned["ref"])
+    kwargs = {}
+    if rounds:
+        params["eval_metric"] = "auc"
+        # xgb.train wants evaluation matrices built against the training one
+        kwargs = {"evals": [(quantized(val_idx, dtrain), "validation_0")], "early_stopping_rounds": rounds,
+                  "verbose_eval": False}
+    booster = xgb.train(params, dtrain, num_boost_round=n_estimators, **kwargs)
+    return xgboost_classifier(booster, params)
+
+
+# CATBOOST
+
+def _build_catboost(model, X, y):
+    from catboost import Pool
+
+    params = model.get_params()
+    pool = Pool(X, label=np.asarray(y))
+    pool.quantize(border_count=params.get("border_count"), nan_mode=params.get("nan_mode"))
+    return pool
+
+
+def _fit_catboost(model, pool, train_idx, val_idx, rounds):
+    if not rounds:
+        return model.fit(pool.slice(train_idx))
+    return model.fit(
+        pool.slice(train_idx), eval_set=pool.slice(val_idx), early_stopping_rounds=rounds, use_best_model=True
+    )
+
+
+BINNED_TRAINERS = {
+    MODEL_NAMES["lgbm"]: (_build_lightgbm, _fit_lightgbm),
+    MODEL_NAMES["xgb"]: (_build_xgboost, _fit_xgboost),
+    MODEL_NAMES["cat"]: (_build_catboost, _fit_catboost),
+}
+
+
+def build_binned(model_name, model, X, y):
+    """
+    Quantizes X once into model_name's native binned training structure.
+    """
+    if model_name not in BINNED_TRAINERS:
+        raise CustomException(f"No binned training for {model_name}", sys)
+    return BINNED_TRAINERS[model_name][0](model, X, y)
+
+
+def fit_binned(model_name, model, binned, train_idx, val_idx=None, early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    """
+    Fits `model`'s configuration on the train_idx rows of a binned matrix
+    and returns the fitted model (a new object for LightGBM / XGBoost).
+    With val_idx, training stops early on the AUC of those rows.
+    """
+    rounds = early_stopping_rounds if val_idx is not None else None
+    return BINNED_TRAINERS[model_name][1](model, binned, train_idx, val_idx, rounds)
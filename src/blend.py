@@ -0,0 +1,217 @@
+# src/blend.py
+
+import os
+import json
+import logging
+import numpy as np
+from src.exception import CustomException
+import sys
+
+from .config import (
+    OOF_FILE,
+    ENSEMBLE_WEIGHTS_FILE,
+    ENSEMBLE_WEIGHTS,
+    ENSEMBLE_METHOD,
+    WEIGHT_SEARCH_STEP,
+    WEIGHT_SEARCH_MIN_STEP,
+    CV_FOLDS,
+    SHUFFLE,
+    SEED,
+)
+from .evaluate import threshold_curve, roc_auc
+
+logger = logging.getLogger(__name__)
+
+
+# An ensemble spec says how run_ensemble / EnsemblePredictor combine each
+# model type's fold-mean probability p_m:
+#   {"method": "blend", "weights": {m: w}}                  sum_m w * p_m
+#   {"method": "stack", "weights": {m: c}, "intercept": b}  sigmoid(b + sum_m c * logit(p_m))
+# run_weight_search writes one to ENSEMBLE_WEIGHTS_FILE from the OOF
+# predictions saved by training; without it ENSEMBLE_WEIGHTS is a blend.
+
+LOGIT_EPS = 1e-7
+
+
+def save_oof(all_oof, y, path=OOF_FILE):
+    """
+    Writes {model: OOF probabilities} and the labels to one .npz file.
+    A file holding the same predictions is left alone, so a fully resumed
+    run keeps its mtime and load_ensemble_spec does not call the blend stale.
+    """
+    if path.exists():
+        old_oof, old_y = load_oof(path)
+        if (
+            np.array_equal(old_y, np.asarray(y, dtype=np.int8))
+            and old_oof.keys() == all_oof.keys()
+            and all(np.array_equal(old_oof[name], np.asarray(p)) for name, p in all_oof.items())
+        ):
+            logger.info(f"OOF predictions unchanged; keeping {path}")
+            return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp.npz")
+    np.savez(tmp, y=np.asarray(y, dtype=np.int8), **{name: np.asarray(p) for name, p in all_oof.items()})
+    os.replace(tmp, path)
+    logger.info(f"Saved OOF predictions of {list(all_oof)} -> {path}")
+
+
+def load_oof(path=OOF_FILE):
+    if not path.exists():
+        raise CustomException(f"{path} not found; run --train first", sys)
+    with np.load(path) as data:
+        y = data["y"]
+        all_oof = {name: data[name] for name in data.files if name != "y"}
+    return all_oof, y
+
+
+def split_by_class(all_oof, y):
+    """
+    OOF matrix (rows x models) split into positive and negative rows, so a
+    candidate's AUC is a sort of each class's blended scores plus a binary
+    search of the positives into the negatives. The blend order changes with
+    the weights, so both classes are sorted again for every candidate;
+    sorting the positives too keeps that search cache-friendly.
+    """
+    names = list(all_oof)
+    matrix = np.column_stack([all_oof[name] for name in names])
+    positive = np.asarray(y) == 1
+    return {"names": names, "pos": matrix[positive], "neg": matrix[~positive]}
+
+
+def blend_auc(split, w):
+    """
+    ROC-AUC of the blend `split` rows @ w (ties count half).
+    """
+    neg = np.sort(split["neg"] @ w)
+    pos = np.sort(split["pos"] @ w)
+    below = np.searchsorted(neg, pos, side="left")
+    ties = np.searchsorted(neg, pos, side="right") - below
+    return float((below.sum() + 0.5 * ties.sum()) / (len(pos) * len(neg)))
+
+
+def search_weights(split, start, step=WEIGHT_SEARCH_STEP, min_step=WEIGHT_SEARCH_MIN_STEP):
+    """
+    Hill climbing over convex weights: each round scores every move of
+    `step` weight from one model to another and takes the best one, or
+    halves the step when none improves the AUC.
+    """
+    w = np.asarray(start, dtype=np.float64)
+    best = blend_auc(split, w)
+    n_evals = 1
+
+    while step >= min_step:
+        candidates = []
+        for i in range(len(w)):
+            for j in range(len(w)):
+                if i != j and w[i] > 0:
+                    cand = w.copy()
+                    moved = min(step, w[i])
+                    cand[i] -= moved
+                    cand[j] += moved
+                    candidates.append(cand)
+
+        scores = [blend_auc(split, cand) for cand in candidates]
+        n_evals += len(candidates)
+        if scores and max(scores) > best:
+            i = int(np.argmax(scores))
+            w, best = candidates[i], scores[i]
+        else:
+            step /= 2
+
+    return w, best, n_evals
+
+
+def _logit(p):
+    p = np.clip(p, LOGIT_EPS, 1 - LOGIT_EPS)
+    return np.log(p) - np.log1p(-p)
+
+
+def fit_stack(all_oof, y):
+    """
+    Logistic regression on the models' OOF logits. Returns the stack spec
+    and its cross-validated AUC.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    names = list(all_oof)
+    Z = np.column_stack([_logit(all_oof[name]) for name in names])
+    cv = StratifiedKFold(n_splits=CV_FOLDS, shuffle=SHUFFLE, random_state=SEED)
+
+    meta = LogisticRegression()
+    cv_pred = cross_val_predict(meta, Z, y, cv=cv, method="decision_function")
+    meta.fit(Z, y)
+
+    spec = {
+        "method": "stack",
+        "weights": {name: float(c) for name, c in zip(names, meta.coef_[0])},
+        "intercept": float(meta.intercept_[0]),
+    }
+    return spec, roc_auc(threshold_curve(y, cv_pred))
+
+
+def combine_probas(spec, probas):
+    """
+    Ensemble probability from {model: fold-mean probability}.
+    """
+    if spec["method"] == "stack":
+        z = np.full(len(next(iter(probas.values()))), spec["intercept"])
+        for name, coef in spec["weights"].items():
+            z += coef * _logit(probas[name])
+        return 1.0 / (1.0 + np.exp(-z))
+
+    final_pred = np.zeros(len(next(iter(probas.values()))))
+    for name, weight in spec["weights"].items():
+        final_pred += weight * probas[name]
+    return final_pred
+
+
+def load_ensemble_spec(path=ENSEMBLE_WEIGHTS_FILE):
+    """
+    The spec written by run_weight_search, or ENSEMBLE_WEIGHTS as a blend.
+    """
+    if not path.exists():
+        return {"method": "blend", "weights": dict(ENSEMBLE_WEIGHTS)}
+
+    with open(path) as f:
+        spec = json.load(f)
+    if OOF_FILE.exists() and OOF_FILE.stat().st_mtime > path.stat().st_mtime:
+        logger.warning(f"{path} predates the last training run; re-run --blend")
+    return spec
+
+
+def run_weight_search(method=ENSEMBLE_METHOD, oof_file=OOF_FILE, path=ENSEMBLE_WEIGHTS_FILE):
+    """
+    Finds blend weights (and a stacking model) on the saved OOF predictions
+    and writes the `method` one to `path`.
+    """
+    if method not in ("blend", "stack"):
+        raise CustomException(f"Unknown ensemble method {method}; use 'blend' or 'stack'", sys)
+
+    all_oof, y = load_oof(oof_file)
+    split = split_by_class(all_oof, y)
+    names = split["names"]
+
+    # start from the configured weights, renormalized over the models present
+    start = np.array([ENSEMBLE_WEIGHTS.get(name, 0.0) for name in names])
+    start = start / start.sum() if start.sum() > 0 else np.full(len(names), 1 / len(names))
+    baseline = blend_auc(split, start)
+
+    w, blend_score, n_evals = search_weights(split, start)
+    logger.info(f"Blend AUC {baseline:.5f} -> {blend_score:.5f} after {n_evals} candidates")
+    blend = {"method": "blend", "weights": {name: round(float(v), 6) for name, v in zip(names, w)}}
+
+    stack, stack_score = fit_stack(all_oof, y)
+    logger.info(f"Stacking AUC (cross-validated) {stack_score:.5f}")
+
+    spec = dict(blend if method == "blend" else stack)
+    spec.update(baseline_auc=baseline, blend_auc=blend_score, stack_auc=stack_score, rows=len(y))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".tmp"), "w") as f:
+        json.dump(spec, f, indent=2)
+    os.replace(path.with_suffix(".tmp"), path)
+
+    logger.info(f"Ensemble {method} weights {spec['weights']} -> {path}")
+    return spec
@@ -11,14 +11,30 @@ PROCESSED_DATA_DIR = DATA_DIR / "processed"
 TRAIN_FILE = PROCESSED_DATA_DIR / "train.csv"
 TEST_FILE = PROCESSED_DATA_DIR / "test.csv"
 
+# Raw CSVs are read in chunks of this many rows and downcast to the typed
+# schema in src/schema.py, so full-width default dtypes never exist for a whole file.
+RAW_CHUNK_ROWS = 200_000
+
+# Format of the processed stage: "npy" (memory-mapped column store),
+# "feather" (needs pyarrow) or "csv". Loaders fall back to the CSV files
+# when no up-to-date binary copy exists.
+PROCESSED_FORMAT = "npy"
+
+# Feature matrix cache (keyed by input data + features.py contents).
+# Least recently used entries are evicted past the size limit.
+FEATURE_CACHE_ENABLED = True
+FEATURE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
 # ARTIFACT PATHS
 ARTIFACTS_DIR = BASE_DIR / "artifacts"
 MODEL_DIR = ARTIFACTS_DIR / "models"
 LOG_DIR = ARTIFACTS_DIR / "logs"
 SUBMISSION_DIR = ARTIFACTS_DIR / "submissions"
+FEATURE_CACHE_DIR = ARTIFACTS_DIR / "feature_cache"
+FLAT_ENSEMBLE_FILE = ARTIFACTS_DIR / "flat_ensemble.npz"  # written by --compile
 
 # Ensure directories exist
-for path in [PROCESSED_DATA_DIR, MODEL_DIR, LOG_DIR, SUBMISSION_DIR]:
+for path in [PROCESSED_DATA_DIR, MODEL_DIR, LOG_DIR, SUBMISSION_DIR, FEATURE_CACHE_DIR]:
     os.makedirs(path, exist_ok=True)
 
 
@@ -26,11 +42,62 @@ for path in [PROCESSED_DATA_DIR, MODEL_DIR, LOG_DIR, SUBMISSION_DIR]:
 SEED  = 42
 TARGET_COL = "diagnosed_diabetes"
 
+# Train dedup at ingest: rows are matched on a 64-bit fingerprint of every
+# column except DEDUP_EXCLUDE_COLS. The first copy of a duplicate is kept;
+# groups whose copies disagree on the target keep their first row ("first",
+# the default; they are counted in the log) or, opt-in, are removed entirely
+# ("drop").
+DEDUP_EXCLUDE_COLS = ["id", TARGET_COL]
+DEDUP_CONFLICTS = "first"
+# With DEDUP_OUT_OF_CORE the raw train CSV is deduplicated on disk into
+# DEDUP_TRAIN_FILE (two streaming passes, src/dedup.py) before it is loaded,
+# instead of deduplicating the loaded frame in memory.
+DEDUP_OUT_OF_CORE = False
+DEDUP_TRAIN_FILE = PROCESSED_DATA_DIR / "train_dedup.csv"
+
 # Cross Validation Settings
 CV_FOLDS = 5
 CV_STRATIFIED = True
 SHUFFLE = True
 
+# Early stopping: each fold stops once its validation AUC has not improved
+# for this many rounds and keeps the best iteration, which inference then
+# uses (None trains every configured round).
+EARLY_STOPPING_ROUNDS = 100
+
+# Parallel Training Settings
+# (model, fold) fits run in a process pool. Each fit uses TRAIN_THREADS_PER_FIT
+# library threads and the CPU budget decides how many fits run at once.
+# CatBoost results depend on its thread count, so keep TRAIN_THREADS_PER_FIT
+# fixed to reproduce a run; the number of workers does not change results.
+TRAIN_CPU_BUDGET = os.cpu_count() or 1
+TRAIN_THREADS_PER_FIT = 2
+TRAIN_MAX_WORKERS = 4  # each worker holds its own copy of the feature matrix
+
+# Quantize the feature matrix once per model type into the library's own
+# binned structure and train every fold on a row subset of it (src/binned.py),
+# instead of copying X.iloc[train_idx] and re-binning it for each fold.
+# Off by default: the shared bin borders come from all train rows, so each
+# fold's validation rows shape the bins it is trained on and CV scores are no
+# longer those of the per-fold baseline (mean fold AUC moved by under 1e-4
+# at 1M rows). Turn it on for the lower fold memory and fit time.
+TRAIN_REUSE_BINS = False
+
+# Resume training from MODEL_DIR/manifest.json (src/manifest.py): folds
+# already fitted on the same feature matrix with the same parameters and CV
+# settings are read back (fold model, OOF slice, score) instead of refitted,
+# so a crashed or partially changed run only fits what is missing.
+TRAIN_RESUME = True
+
+# Out-of-core training (--train --out-of-core): TRAIN_FILE is streamed in
+# chunks through the feature code into a spill file (in the feature matrix's
+# common dtype) under OUT_OF_CORE_DIR. LightGBM then trains from a binned Dataset binary and
+# XGBoost from an external-memory DMatrix. CatBoost has no external-memory
+# mode and is left to the in-memory path.
+OUT_OF_CORE_DIR = ARTIFACTS_DIR / "out_of_core"
+OUT_OF_CORE_CHUNK_ROWS = 200_000
+OUT_OF_CORE_MODELS = ["lightgbm", "xgboost"]
+
 # Model Names
 MODEL_NAMES = {
     "lgbm":"lightgbm",
@@ -41,6 +108,10 @@ MODEL_NAMES = {
 #Threshold Settings
 DEFAULT_THRESHOLD = 0.55 
 
+# OOF evaluation also reports the threshold maximizing this objective:
+# "f1", "youden" (TPR - FPR) or "accuracy"
+THRESHOLD_OBJECTIVE = "f1"
+
 # Ensemble Weight
 ENSEMBLE_WEIGHTS = {
     "lightgbm": 0.25,
@@ -48,6 +119,73 @@ ENSEMBLE_WEIGHTS = {
     "catboost": 0.45
 }
 
+# Ensemble weight search (--blend): training saves every model's OOF
+# predictions to OOF_FILE, and the search writes ENSEMBLE_WEIGHTS_FILE, which
+# scoring reads in place of ENSEMBLE_WEIGHTS once it exists. "blend" looks
+# for the AUC-maximizing convex weights by moving WEIGHT_SEARCH_STEP of weight
+# between pairs of models (halving the step down to WEIGHT_SEARCH_MIN_STEP);
+# "stack" fits a logistic regression on the models' logits instead.
+OOF_FILE = ARTIFACTS_DIR / "oof.npz"
+ENSEMBLE_WEIGHTS_FILE = ARTIFACTS_DIR / "ensemble_weights.json"
+ENSEMBLE_METHOD = "blend"
+WEIGHT_SEARCH_STEP = 0.1
+WEIGHT_SEARCH_MIN_STEP = 0.005
+
+# Fold models are loaded through a process-wide registry (src/registry.py):
+# missing pickles are read on MODEL_LOAD_THREADS threads and cached ones are
+# reused until their file changes, detected by mtime + size ("mtime") or by
+# a SHA-256 of the contents ("hash").
+MODEL_LOAD_THREADS = min(4, os.cpu_count() or 1)
+MODEL_REGISTRY_VERIFY = "mtime"
+
+# Rows per chunk for streaming scoring in run_ensemble (None = score in memory)
+ENSEMBLE_CHUNK_SIZE = None
+
+# Incremental scoring (--ensemble --incremental): run_ensemble keeps a
+# fingerprint of each id's raw values and its last probability in
+# INCREMENTAL_STATE_FILE and only re-scores new or changed rows. Any change
+# to the fold models, the ensemble spec or features.py re-scores every row.
+ENSEMBLE_INCREMENTAL = False
+INCREMENTAL_STATE_FILE = ARTIFACTS_DIR / "incremental_scores.npz"
+
+# Run tracing: each pipeline run writes LOG_DIR/trace_<timestamp>.json with
+# wall/CPU time and RSS per stage. Stages listed in PROFILE_STAGES (or "all")
+# are also run under cProfile, dumped to LOG_DIR/profile_*.prof.
+TRACE_ENABLED = True
+TRACE_SAMPLE_INTERVAL = 0.05  # seconds between RSS samples
+PROFILE_STAGES = []
+
+# Serve the compiled ensemble (FLAT_ENSEMBLE_FILE) memory-mapped read-only:
+# every uvicorn worker maps the same file, so its node arrays sit once in
+# the page cache instead of once per worker.
+FLAT_ENSEMBLE_MMAP = True
+
+# Score the flat ensemble on integer bin indices instead of float64 values:
+# each batch is quantized once against the union of all fold models' split
+# thresholds (uint8 / uint16) and trees compare bins, so feature and
+# threshold reads shrink from 8 bytes to 1-2. Predictions are identical.
+# Batches below flat_trees.QUANTIZE_MIN_ROWS rows stay on float64.
+FLAT_ENSEMBLE_QUANTIZED = True
+
+# Online micro-batching: concurrent /predict requests are scored together
+# once BATCH_MAX_SIZE rows are queued or the oldest waited BATCH_MAX_WAIT_MS.
+BATCH_MAX_SIZE = 64
+BATCH_MAX_WAIT_MS = 2.0
+
+# EnsemblePredictor caches the probability of each scored input row
+# (src/prediction_cache.py), keyed by the raw values and the model-set
+# version, so repeated payloads skip feature building and the fold models.
+# At most PREDICTION_CACHE_SIZE rows are kept (least recently used evicted,
+# 0 disables the cache), each for PREDICTION_CACHE_TTL_S seconds (None = no
+# expiry). With PREDICTION_CACHE_DISK they are also kept in a SQLite file
+# shared by server workers and restarts. Reloading changed models
+# (EnsemblePredictor.reload) invalidates the cache.
+PREDICTION_CACHE_SIZE = 10_000
+PREDICTION_CACHE_TTL_S = 3600
+PREDICTION_CACHE_DISK = False
+PREDICTION_CACHE_FILE = ARTIFACTS_DIR / "prediction_cache.sqlite"
+PREDICTION_CACHE_DISK_MAX_ROWS = 1_000_000
+
 # MODEL DEFAULT PARAMS
 
 LIGHTGBM_PARAMS = {
@@ -78,5 +216,45 @@ CATBOOST_PARAMS = {
     "loss_function": "Logloss",
     "eval_metric": "AUC",
     "verbose": False,
-    "random_seed": SEED
-}
\ No newline at end of file
+    "random_seed": SEED,
+    "allow_writing_files": False,  # no catboost_info/ scratch output
+}
+# Hyperparameter search (--tune, src/tuning.py): successive halving over the
+# CV folds. TUNING_TRIALS configurations sampled from SEARCH_SPACES start on
+# the first TUNING_RUNGS[0] folds; after each rung only the best 1/TUNING_ETA
+# by mean fold AUC go on to the next rung's number of folds. Every fold result
+# is cached under TUNING_DIR, so an interrupted search resumes where it
+# stopped, and no new fit starts once TUNING_CPU_BUDGET_S CPU seconds are
+# spent. Winners are written to TUNED_PARAMS_FILE, which get_model applies on
+# top of the defaults above.
+TUNING_DIR = ARTIFACTS_DIR / "tuning"
+TUNED_PARAMS_FILE = ARTIFACTS_DIR / "tuned_params.json"
+TUNING_TRIALS = 27
+TUNING_ETA = 3
+TUNING_RUNGS = [1, 2, CV_FOLDS]
+TUNING_CPU_BUDGET_S = 4 * 3600
+
+# (kind, low, high) per parameter; "log" samples log-uniformly
+SEARCH_SPACES = {
+    "lightgbm": {
+        "learning_rate": ("log", 0.01, 0.1),
+        "num_leaves": ("int", 15, 255),
+        "min_child_samples": ("int", 10, 200),
+        "colsample_bytree": ("float", 0.5, 1.0),
+        "reg_lambda": ("log", 1e-3, 10.0),
+    },
+    "xgboost": {
+        "learning_rate": ("log", 0.01, 0.1),
+        "max_depth": ("int", 3, 10),
+        "min_child_weight": ("log", 1.0, 50.0),
+        "subsample": ("float", 0.5, 1.0),
+        "colsample_bytree": ("float", 0.5, 1.0),
+        "reg_lambda": ("log", 1e-3, 10.0),
+    },
+    "catboost": {
+        "learning_rate": ("log", 0.01, 0.1),
+        "depth": ("int", 4, 10),
+        "l2_leaf_reg": ("log", 1.0, 30.0),
+        "random_strength": ("float", 0.0, 2.0),
+    },
+}
@@ -0,0 +1,139 @@
+# src/dedup.py
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.exception import CustomException
+import sys
+
+from .config import TARGET_COL, DEDUP_EXCLUDE_COLS, DEDUP_CONFLICTS, RAW_CHUNK_ROWS
+from .schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+
+def row_fingerprints(df: pd.DataFrame, exclude=DEDUP_EXCLUDE_COLS) -> np.ndarray:
+    """
+    64-bit hash of each row over every column except `exclude`.
+    A row's hash depends only on its values, so chunks of one file can be
+    fingerprinted separately.
+    """
+    columns = [c for c in df.columns if c not in set(exclude)]
+    if not columns:
+        raise CustomException("No columns left to fingerprint", sys)
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def find_duplicates(fingerprints: np.ndarray, labels=None, conflicts=DEDUP_CONFLICTS):
+    """
+    Returns (keep mask, report) for a fingerprint array.
+
+    The first row of every fingerprint is kept. If labels are given, groups
+    whose rows disagree on the label are counted as conflicts and, with
+    conflicts="drop", removed entirely.
+    """
+    if conflicts not in ("first", "drop"):
+        raise CustomException(f"Unknown conflict policy {conflicts!r}; use 'first' or 'drop'", sys)
+
+    n = len(fingerprints)
+    order = np.argsort(fingerprints, kind="stable")
+    sorted_fp = fingerprints[order]
+    starts = np.flatnonzero(np.r_[True, sorted_fp[1:] != sorted_fp[:-1]]) if n else np.array([], dtype=np.intp)
+    sizes = np.diff(np.r_[starts, n])
+
+    keep = np.zeros(n, dtype=bool)
+    keep[order[starts]] = True  # stable sort: first row of each group
+
+    report = {
+        "rows": n,
+        "unique_rows": len(starts),
+        "duplicate_rows": n - len(starts),
+        "duplicate_groups": int((sizes > 1).sum()),
+        "conflict_groups": 0,
+        "conflict_rows": 0,
+        "conflict_policy": conflicts,
+    }
+
+    if labels is not None and n:
+        sorted_labels = np.asarray(labels)[order]
+        conflict = np.minimum.reduceat(sorted_labels, starts) != np.maximum.reduceat(sorted_labels, starts)
+        report["conflict_groups"] = int(conflict.sum())
+        report["conflict_rows"] = int(sizes[conflict].sum())
+
+        if conflicts == "drop" and conflict.any():
+            in_conflict = np.repeat(conflict, sizes)
+            keep[order[in_conflict]] = False
+
+    report["dropped_rows"] = int(n - keep.sum())
+    return keep, report
+
+
+def log_report(report, source=""):
+    where = f" in {source}" if source else ""
+    logger.info(
+        f"Duplicates{where}: {report['duplicate_rows']} extra copies in "
+        f"{report['duplicate_groups']} groups, {report['conflict_groups']} groups "
+        f"({report['conflict_rows']} rows) with conflicting labels; "
+        f"dropped {report['dropped_rows']} of {report['rows']} rows"
+    )
+    if report["conflict_groups"]:
+        logger.warning(
+            f"Resolved {report['conflict_groups']} duplicate groups with conflicting labels{where} "
+            f"({report['conflict_rows']} rows) by "
+            f"{'dropping them' if report['conflict_policy'] == 'drop' else 'keeping their first row'}"
+        )
+
+
+def drop_duplicate_rows(df: pd.DataFrame, exclude=DEDUP_EXCLUDE_COLS, target=TARGET_COL,
+                        conflicts=DEDUP_CONFLICTS):
+    """
+    In-memory dedup. Returns (deduplicated frame, report).
+    """
+    fingerprints = row_fingerprints(df, exclude)
+    labels = df[target].to_numpy() if target in df.columns else None
+    keep, report = find_duplicates(fingerprints, labels, conflicts)
+    log_report(report)
+
+    if report["dropped_rows"]:
+        df = df[keep]
+    return df, report
+
+
+def dedup_csv(src_path: Path, dst_path: Path, chunk_rows=RAW_CHUNK_ROWS, exclude=DEDUP_EXCLUDE_COLS,
+              target=TARGET_COL, conflicts=DEDUP_CONFLICTS):
+    """
+    Out-of-core dedup of a CSV that need not fit in memory.
+
+    Pass 1 streams the file and keeps only the fingerprint (8 bytes) and
+    label of each row; pass 2 streams it again and writes the kept rows to
+    dst_path. Result matches drop_duplicate_rows on the whole file.
+    """
+    try:
+        fingerprints, labels = [], []
+        for chunk in pd.read_csv(src_path, chunksize=chunk_rows):
+            chunk = apply_schema(chunk, source=str(src_path))
+            fingerprints.append(row_fingerprints(chunk, exclude))
+            if target in chunk.columns:
+                labels.append(chunk[target].to_numpy())
+
+        fingerprints = np.concatenate(fingerprints) if fingerprints else np.array([], dtype=np.uint64)
+        labels = np.concatenate(labels) if labels else None
+        keep, report = find_duplicates(fingerprints, labels, conflicts)
+        log_report(report, src_path)
+
+        tmp_path = Path(f"{dst_path}.part")
+        start = 0
+        for i, chunk in enumerate(pd.read_csv(src_path, chunksize=chunk_rows)):
+            mask = keep[start:start + len(chunk)]
+            start += len(chunk)
+            chunk[mask].to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        os.replace(tmp_path, dst_path)
+
+        return report
+
+    except CustomException:
+        raise
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -2,7 +2,6 @@ import os
 import logging
 import numpy as np
 import pandas as pd
-import joblib
 from src.exception import CustomException
 import sys
 
@@ -10,59 +9,137 @@ from .config import (
     MODEL_DIR,
     SUBMISSION_DIR,
     TEST_FILE,
-    ENSEMBLE_WEIGHTS,
+    ENSEMBLE_CHUNK_SIZE,
+    ENSEMBLE_INCREMENTAL,
 )
 
 from .features import build_test_matrix
+from .storage import iter_processed_chunks
+from .feature_cache import load_test_matrix
+from .blend import load_ensemble_spec, combine_probas
+from .registry import load_models, load_fold_models
+from .models import positive_proba
+from .tracing import span
 
 logger = logging.getLogger(__name__)
 
-def load_models_for_type(model_name):
-    path = MODEL_DIR / model_name
-    models = []
-
-    for file in sorted(os.listdir(path)):
-        if file.endswith(".pkl"):
-            models.append(joblib.load(path / file))
-
-    if not models:
-        raise CustomException(f"No saved models found for {model_name}")
-    
-    return models
+def load_models_for_type(model_name, model_dir=MODEL_DIR):
+    """
+    Fold models of one type, through the process-wide registry.
+    """
+    return load_fold_models(model_name, model_dir)
 
 def predict_with_models(models, X):
+    """
+    Fold-mean probability. Early-stopped fold models only evaluate the
+    trees up to their saved best iteration.
+    """
     preds = []
 
     for m in models:
-        p = m.predict_proba(X)[:,1]
+        p = positive_proba(m, X)
         preds.append(p)
     return np.mean(preds, axis=0)
 
-def run_ensemble():
-    logger.info("Loading processed test data...")
-    df_test = pd.read_csv(TEST_FILE)
-
-    logger.info("Building test matrix...")
-    X_test, features = build_test_matrix(df_test)
-
-    final_pred = np.zeros(len(X_test))
-
-    for model_name, weight in ENSEMBLE_WEIGHTS.items():
-        logger.info(f"Using {model_name} with weight {weight}")
-
-        models = load_models_for_type(model_name)
-        probas = predict_with_models(models, X_test)
-
-        final_pred += weight * probas
+def load_ensemble_models(model_dir=MODEL_DIR, spec=None):
+    """
+    Loads the fold models of every type the ensemble spec uses.
+    """
+    spec = spec or load_ensemble_spec()
+    return load_models(spec["weights"], model_dir)
+
+def predict_ensemble(ensemble_models, X, spec=None):
+    """
+    Combines each model type's fold-mean probability as the ensemble spec
+    says (weighted average or stacking model, see src/blend.py).
+    """
+    spec = spec or load_ensemble_spec()
+    probas = {name: predict_with_models(ensemble_models[name], X) for name in spec["weights"]}
+    return combine_probas(spec, probas)
+
+def run_ensemble(chunk_size=ENSEMBLE_CHUNK_SIZE, model_dir=MODEL_DIR, test_file=TEST_FILE,
+                 submission_dir=SUBMISSION_DIR, incremental=ENSEMBLE_INCREMENTAL):
+    """
+    Writes the ensemble submission for test_file and returns its path (the
+    same from the in-memory, streaming and incremental paths).
+    """
+    if incremental:
+        from .incremental import run_ensemble_incremental
+
+        return run_ensemble_incremental(model_dir, test_file, submission_dir)
+    if chunk_size:
+        return run_ensemble_streaming(chunk_size, model_dir, test_file, submission_dir)
+
+    logger.info("Loading test matrix...")
+    with span("load_test_matrix") as s:
+        X_test, features, ids = load_test_matrix(test_file)
+        s["rows"] = len(X_test)
+
+    spec = load_ensemble_spec()
+    with span("load_models"):
+        ensemble_models = load_ensemble_models(model_dir, spec)
+    probas = {}
+
+    for model_name, weight in spec["weights"].items():
+        logger.info(f"Using {model_name} with {spec['method']} weight {weight}")
+
+        with span(f"{model_name}/predict", rows=len(X_test)):
+            probas[model_name] = predict_with_models(ensemble_models[model_name], X_test)
+
+    final_pred = combine_probas(spec, probas)
 
     submission = pd.DataFrame({
-        "id": df_test["id"],
+        "id": ids,
         "diagnosed_diabetes": final_pred
     })
 
-    SUBMISSION_DIR.mkdir(parents=True, exist_ok=True)
-    save_path = SUBMISSION_DIR / "submission.csv"
-    submission.to_csv(save_path, index=False)
+    submission_dir.mkdir(parents=True, exist_ok=True)
+    save_path = submission_dir / "submission.csv"
+    with span("write_csv", rows=len(submission)):
+        submission.to_csv(save_path, index=False)
+
+    logger.info(f"Submission saved -> {save_path}")
+    return save_path
+
+def run_ensemble_streaming(chunk_size, model_dir=MODEL_DIR, test_file=TEST_FILE,
+                           submission_dir=SUBMISSION_DIR):
+    """
+    Scores TEST_FILE in chunks of `chunk_size` rows and appends each chunk
+    to the submission, so peak memory follows the chunk size rather than
+    the file size. Output is identical to the in-memory path.
+    """
+    logger.info(f"Streaming test data in chunks of {chunk_size} rows...")
+    spec = load_ensemble_spec()
+    with span("load_models"):
+        ensemble_models = load_ensemble_models(model_dir, spec)
+
+    submission_dir.mkdir(parents=True, exist_ok=True)
+    save_path = submission_dir / "submission.csv"
+    part_path = save_path.with_suffix(".csv.part")
+
+    n_rows = 0
+    try:
+        for i, df_chunk in enumerate(iter_processed_chunks(test_file, chunk_size)):
+            with span("build_test_matrix", rows=len(df_chunk)):
+                X_chunk, _ = build_test_matrix(df_chunk)
+
+            with span("predict", rows=len(df_chunk)):
+                submission = pd.DataFrame({
+                    "id": df_chunk["id"],
+                    "diagnosed_diabetes": predict_ensemble(ensemble_models, X_chunk, spec)
+                })
+            with span("write_csv", rows=len(submission)):
+                submission.to_csv(part_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+            n_rows += len(submission)
+            logger.info(f"Scored chunk {i + 1} ({n_rows} rows so far)")
+
+        os.replace(part_path, save_path)
+
+    except Exception as e:
+        if part_path.exists():
+            part_path.unlink()
+        raise CustomException(e, sys)
 
     logger.info(f"Submission saved -> {save_path}")
-    return submission
\ No newline at end of file
+    return save_path
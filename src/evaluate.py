@@ -2,37 +2,156 @@
 
 import logging
 import numpy as np
-from sklearn.metrics import (
-    roc_auc_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    average_precision_score
-)
-from .config import DEFAULT_THRESHOLD
+from src.exception import CustomException
+import sys
+
+from .config import DEFAULT_THRESHOLD, THRESHOLD_OBJECTIVE
 
 logger = logging.getLogger(__name__)
 
 
-def evaluate_predictions(y_true, probas, threshold=DEFAULT_THRESHOLD):
+# Every metric here comes from one descending sort of the probabilities.
+# Cumulative positive counts at the end of each run of tied scores give the
+# confusion matrix at every distinct threshold ("predict 1 when p >= t"),
+# from which ROC-AUC, PR-AUC (average precision) and precision / recall /
+# F1 follow without another pass over the rows. Values match sklearn's
+# roc_auc_score, average_precision_score and precision/recall/f1_score.
+
+OBJECTIVES = {
+    "f1": lambda c: c["f1"],
+    "youden": lambda c: c["recall"] - c["fp"] / c["negatives"],
+    "accuracy": lambda c: (c["tp"] + c["negatives"] - c["fp"]) / (c["positives"] + c["negatives"]),
+}
+
+
+def threshold_curve(y_true, probas):
+    """
+    Confusion counts and precision / recall / F1 at every distinct
+    probability, thresholds in descending order.
+    """
+    probas = np.asarray(probas)
+    order = np.argsort(probas, kind="stable")[::-1]
+    sorted_p = probas[order]
+    tp = np.cumsum(np.asarray(y_true)[order] == 1, dtype=np.int64)
+    del order
+
+    # last row of each run of equal scores
+    ends = np.append(np.flatnonzero(sorted_p[1:] != sorted_p[:-1]), len(sorted_p) - 1)
+    thresholds = sorted_p[ends]
+    tp = tp[ends]
+    del sorted_p
+    fp = ends + 1 - tp
+
+    positives, negatives = int(tp[-1]), int(fp[-1])
+    if positives == 0 or negatives == 0:
+        raise CustomException("Evaluation needs both classes in y_true", sys)
+
+    precision = tp / (tp + fp)
+    recall = tp / positives
+    f1 = 2 * tp / (tp + fp + positives)
+
+    return {
+        "thresholds": thresholds,
+        "tp": tp,
+        "fp": fp,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "positives": positives,
+        "negatives": negatives,
+    }
+
+
+def roc_auc(curve):
+    """
+    Trapezoidal area under the ROC curve.
+    """
+    tp = np.append(0, curve["tp"]).astype(np.float64)
+    fp = np.append(0, curve["fp"]).astype(np.float64)
+    area = np.dot(np.diff(fp), tp[1:] + tp[:-1]) / 2
+    return float(area / (curve["positives"] * curve["negatives"]))
+
+
+def pr_auc(curve):
+    """
+    Average precision: precision weighted by each step in recall.
+    """
+    return float(np.dot(np.diff(curve["recall"], prepend=0.0), curve["precision"]))
+
+
+def metrics_at(curve, threshold):
+    """
+    Precision, recall and F1 of predicting 1 when p >= threshold.
+    """
+    # thresholds are descending: k of them are >= threshold
+    k = np.searchsorted(-curve["thresholds"], -threshold, side="right")
+    if k == 0:
+        return {"precision": 0.0, "recall": 0.0, "f1": 0.0}
+    return {key: float(curve[key][k - 1]) for key in ("precision", "recall", "f1")}
+
+
+def best_threshold(curve, objective=THRESHOLD_OBJECTIVE):
     """
-    Evaluate probability predictions using multiple metrics.
+    Threshold maximizing `objective` (see OBJECTIVES) and its score.
     """
+    if objective not in OBJECTIVES:
+        raise CustomException(f"Unknown threshold objective {objective}; use one of {list(OBJECTIVES)}", sys)
+    score = OBJECTIVES[objective](curve)
+    i = int(np.argmax(score))
+    return float(curve["thresholds"][i]), float(score[i])
 
-    preds = (probas >= threshold).astype(int)
+
+def evaluate_predictions(y_true, probas, threshold=DEFAULT_THRESHOLD, objective=THRESHOLD_OBJECTIVE):
+    """
+    Evaluate probability predictions using multiple metrics, plus the
+    threshold that maximizes `objective`.
+    """
+    curve = threshold_curve(y_true, probas)
+    best, best_score = best_threshold(curve, objective)
 
     results = {
-        "roc_auc": roc_auc_score(y_true, probas),
-        "pr_auc": average_precision_score(y_true, probas),
-        "precision": precision_score(y_true, preds),
-        "recall": recall_score(y_true, preds),
-        "f1": f1_score(y_true, preds),
-        "threshold": threshold
+        "roc_auc": roc_auc(curve),
+        "pr_auc": pr_auc(curve),
+        **metrics_at(curve, threshold),
+        "threshold": threshold,
+        "best_threshold": best,
+        f"best_{objective}": best_score,
     }
 
     return results
 
 
+def evaluate_oof(all_oof, y_true, spec=None, threshold=DEFAULT_THRESHOLD, objective=THRESHOLD_OBJECTIVE):
+    """
+    Evaluates every model's OOF predictions (the all_oof dict returned by
+    run_training) and their ensemble, combined like run_ensemble does with
+    `spec` (default: blend.load_ensemble_spec()). Blend weights of models
+    missing from all_oof are dropped and the rest renormalized; a stack
+    needs all of its models.
+    """
+    # blend imports this module for its AUC
+    from .blend import load_ensemble_spec, combine_probas
+
+    results = {
+        name: evaluate_predictions(y_true, probas, threshold, objective)
+        for name, probas in all_oof.items()
+    }
+
+    if spec is None:
+        spec = load_ensemble_spec()
+    used = {name: w for name, w in spec["weights"].items() if name in all_oof}
+    if spec["method"] == "stack" and len(used) < len(spec["weights"]):
+        logger.warning("OOF predictions are missing models of the stacking spec; ensemble not evaluated")
+    elif len(used) > 1:
+        if spec["method"] != "stack":
+            total = sum(used.values())
+            spec = {"method": "blend", "weights": {name: w / total for name, w in used.items()}}
+        ensemble = combine_probas(spec, {name: all_oof[name] for name in used})
+        results["ensemble"] = evaluate_predictions(y_true, ensemble, threshold, objective)
+
+    return results
+
+
 def print_eval_results(name, results: dict):
     logger.info(f"\n===== {name.upper()} EVALUATION =====")
     for k, v in results.items():
@@ -0,0 +1,215 @@
+# src/feature_cache.py
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from . import features
+from .config import (
+    TRAIN_FILE,
+    TEST_FILE,
+    TARGET_COL,
+    FEATURE_CACHE_DIR,
+    FEATURE_CACHE_ENABLED,
+    FEATURE_CACHE_MAX_BYTES,
+)
+from .features import build_train_matrix, build_test_matrix
+from .tracing import span
+from .storage import find_processed_store, load_processed_frame, save_npy_store, load_npy_store
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+FINGERPRINT_MEMO = "fingerprints.json"
+HASH_BLOCK = 1 << 20
+
+
+def _hash_file(h, path: Path):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+
+
+def _stat_key(file: Path):
+    st = file.stat()
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def fingerprint_path(path: Path) -> str:
+    """
+    Content hash of a processed file or column-store directory.
+    Per-file hashes are memoised by (size, mtime, inode) in the cache
+    directory, so unchanged inputs are only read once.
+    """
+    memo_path = FEATURE_CACHE_DIR / FINGERPRINT_MEMO
+    try:
+        with open(memo_path) as f:
+            memo = json.load(f)
+    except (OSError, ValueError):
+        memo = {}
+
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+
+    h = hashlib.blake2b(digest_size=16)
+    changed = False
+    for file in files:
+        key, stat = str(file.resolve()), _stat_key(file)
+        cached = memo.get(key)
+        if cached is None or cached["stat"] != stat:
+            fh = hashlib.blake2b(digest_size=16)
+            _hash_file(fh, file)
+            memo[key] = cached = {"stat": stat, "hash": fh.hexdigest()}
+            changed = True
+        h.update(file.name.encode())
+        h.update(cached["hash"].encode())
+
+    if changed:
+        memo = {k: v for k, v in memo.items() if os.path.exists(k)}
+        FEATURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = memo_path.with_name(memo_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(memo, f)
+        os.replace(tmp, memo_path)
+
+    return h.hexdigest()
+
+
+def feature_code_version() -> str:
+    """
+    Hash of features.py, so any change to feature code invalidates the cache.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _hash_file(h, Path(features.__file__))
+    h.update(TARGET_COL.encode())
+    return h.hexdigest()
+
+
+def cache_key(kind: str, csv_path: Path) -> str:
+    _, path = find_processed_store(csv_path)
+    return f"{kind}-{fingerprint_path(path)}-{feature_code_version()}"
+
+
+def _entry_size(entry: Path) -> int:
+    return sum(p.stat().st_size for p in entry.rglob("*") if p.is_file())
+
+
+def _touch(entry: Path):
+    os.utime(entry / META_FILE)
+
+
+def _read_entry(entry: Path):
+    with open(entry / META_FILE) as f:
+        meta = json.load(f)
+
+    X = load_npy_store(entry / "X")
+    extras = {
+        name: np.asarray(np.load(entry / f"{name}.npy", mmap_mode="r"))
+        for name in meta["extras"]
+    }
+    _touch(entry)
+    return X, meta["features"], extras
+
+
+def _write_entry(entry: Path, X, feature_cols, extras: dict):
+    tmp = entry.with_name(entry.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    save_npy_store(X, tmp / "X")
+    for name, values in extras.items():
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(values))
+
+    with open(tmp / META_FILE, "w") as f:
+        json.dump({
+            "features": list(feature_cols),
+            "extras": list(extras),
+            "created": time.time(),
+        }, f, indent=2)
+
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+
+
+def evict_lru(max_bytes: int = FEATURE_CACHE_MAX_BYTES, keep=None):
+    """
+    Deletes least recently used entries until the cache fits in max_bytes.
+    """
+    entries = [e for e in FEATURE_CACHE_DIR.iterdir() if (e / META_FILE).exists()]
+    entries.sort(key=lambda e: (e / META_FILE).stat().st_mtime)
+
+    total = sum(_entry_size(e) for e in entries)
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        if entry == keep:
+            continue
+        total -= _entry_size(entry)
+        shutil.rmtree(entry, ignore_errors=True)
+        logger.info(f"Evicted feature cache entry {entry.name}")
+
+
+def _cached(kind: str, csv_path: Path, build):
+    """
+    Returns (X, features, extras) from the cache, building and storing on a miss.
+    """
+    if not FEATURE_CACHE_ENABLED:
+        return _load_and_build(kind, csv_path, build)
+
+    entry = FEATURE_CACHE_DIR / cache_key(kind, csv_path)
+    if (entry / META_FILE).exists():
+        logger.info(f"Feature cache hit -> {entry.name}")
+        with span("read_feature_cache"):
+            return _read_entry(entry)
+
+    logger.info(f"Feature cache miss -> {entry.name}")
+    X, feature_cols, extras = _load_and_build(kind, csv_path, build)
+
+    with span("write_feature_cache"):
+        FEATURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_entry(entry, X, feature_cols, extras)
+        evict_lru(keep=entry)
+
+        return _read_entry(entry)
+
+
+def _load_and_build(kind, csv_path, build):
+    with span("load_processed"):
+        df = load_processed_frame(csv_path)
+    with span(f"build_{kind}_matrix", rows=len(df)):
+        return build(df)
+
+
+def _build_train(df):
+    X, y, feature_cols = build_train_matrix(df)
+    return X, feature_cols, {"y": y.to_numpy()}
+
+
+def _build_test(df):
+    X, feature_cols = build_test_matrix(df)
+    extras = {"id": df["id"].to_numpy()} if "id" in df.columns else {}
+    return X, feature_cols, extras
+
+
+def load_train_matrix(csv_path: Path = TRAIN_FILE):
+    """
+    Cached build_train_matrix over a processed file. Returns X, y, features.
+    """
+    X, feature_cols, extras = _cached("train", csv_path, _build_train)
+    y = pd.Series(extras["y"], name=TARGET_COL, copy=False)
+    return X, y, feature_cols
+
+
+def load_test_matrix(csv_path: Path = TEST_FILE):
+    """
+    Cached build_test_matrix over a processed file. Returns X, features, ids.
+    """
+    X, feature_cols, extras = _cached("test", csv_path, _build_test)
+    ids = pd.Series(extras["id"], name="id", copy=False) if "id" in extras else None
+    return X, feature_cols, ids
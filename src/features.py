@@ -3,10 +3,283 @@ import numpy as np
 from .config import TARGET_COL
 
 
+# Engineered columns, in the order create_features appends them.
+DERIVED_FEATURES = [
+    "pulse_pressure",
+    "pulse_pressure_ratio",
+    "mean_arterial_pressure",
+    "rate_pressure_product",
+    "ldl_hdl_ratio",
+    "chol_hdl_ratio",
+    "non_hdl_cholesterol",
+    "ldl_share",
+    "tg_hdl_ratio",
+    "lipid_sum",
+    "lipid_burden",
+    "age_bmi_risk",
+    "activity_age_ratio",
+    "activity_x_age",
+    "screen_activity_ratio",
+    "lifestyle_risk_score",
+    "risk_history",
+    "genetic_history_risk",
+    "age_map_risk",
+]
+
+# Raw columns the feature kernel reads.
+FEATURE_INPUTS = [
+    "age",
+    "bmi",
+    "waist_to_hip_ratio",
+    "systolic_bp",
+    "diastolic_bp",
+    "heart_rate",
+    "cholesterol",
+    "ldl",
+    "hdl",
+    "triglycerides",
+    "physical_activity",
+    "screen_time",
+    "sleep_duration",
+    "hypertension_history",
+    "cardiovascular_history",
+    "family_history",
+]
+
+EPS = 1e-6
+
+# (coefficient, column, sign) terms of lifestyle_risk_score, in evaluation order.
+LIFESTYLE_TERMS = [
+    (0.3, "bmi", 1),
+    (0.2, "waist_to_hip_ratio", 1),
+    (0.2, "screen_time", 1),
+    (0.2, "physical_activity", -1),
+    (0.1, "sleep_duration", -1),
+]
+
+
+def _work_dtype(dtype):
+    """
+        Float dtype a column is computed in. Integer results are exact in
+        it, so only float precision has to follow the pandas promotion.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return dtype
+    return np.result_type(dtype, np.float32)
+
+
+def read_feature_inputs(df: pd.DataFrame) -> dict:
+    """
+        Reads each raw input column once as a contiguous array.
+        Returns {column: values} for the input columns present in df.
+
+        Float columns are widened to float64 (exactly), so derived features
+        come out as on the untyped CSV frame whatever the storage dtype.
+    """
+    raw = {}
+    for col in FEATURE_INPUTS:
+        if col in df.columns:
+            values = df[col].to_numpy()
+            if values.dtype.kind == "f":
+                values = values.astype(np.float64, copy=False)
+            raw[col] = np.ascontiguousarray(values)
+    return raw
+
+
+def _apply(ufunc, *operands, out=None):
+    """
+        Applies a ufunc with the dtype pandas would use on the original
+        columns. Operands are (values, dtype) pairs or python scalars.
+        Returns a (values, dtype) pair.
+    """
+    dtype = np.result_type(*(o[1] if isinstance(o, tuple) else o for o in operands))
+    if ufunc is np.divide:
+        dtype = np.result_type(dtype, 1.0)
+    work = _work_dtype(dtype)
+    args = [o[0].astype(work, copy=False) if isinstance(o, tuple) else o for o in operands]
+    return ufunc(*args, out=out), dtype
+
+
+def _run_kernel(raw: dict, buf: np.ndarray) -> dict:
+    """
+        Writes every derived feature into its column of buf.
+        Returns {feature: dtype the pandas path gives that column}.
+    """
+    pos = {name: j for j, name in enumerate(DERIVED_FEATURES)}
+
+    # Missing-input branches leave an int 0 column, as in the pandas path
+    dtypes = dict.fromkeys(DERIVED_FEATURES, np.dtype(np.int64))
+
+    def has(*cols):
+        return all(c in raw for c in cols)
+
+    def r(col):
+        return raw[col], raw[col].dtype
+
+    def put(name, ufunc, *operands):
+        _, dtypes[name] = _apply(ufunc, *operands, out=buf[:, pos[name]])
+
+    def d(name):
+        return buf[:, pos[name]], dtypes[name]
+
+    # Cardiovascular Features
+    if has("systolic_bp", "diastolic_bp"):
+        sbp, dbp = r("systolic_bp"), r("diastolic_bp")
+        put("pulse_pressure", np.subtract, sbp, dbp)
+        put("pulse_pressure_ratio", np.divide, d("pulse_pressure"), _apply(np.add, sbp, EPS))
+        put("mean_arterial_pressure", np.divide, _apply(np.add, sbp, _apply(np.multiply, 2, dbp)), 3)
+
+    if has("heart_rate", "systolic_bp"):
+        put("rate_pressure_product", np.multiply, r("heart_rate"), r("systolic_bp"))
+
+    # Lipid Profile Features
+    if has("cholesterol", "ldl", "hdl", "triglycerides"):
+        chol, ldl, hdl, tg = r("cholesterol"), r("ldl"), r("hdl"), r("triglycerides")
+        hdl_eps = _apply(np.add, hdl, EPS)
+        put("ldl_hdl_ratio", np.divide, ldl, hdl_eps)
+        put("chol_hdl_ratio", np.divide, chol, hdl_eps)
+        put("non_hdl_cholesterol", np.subtract, chol, hdl)
+        put("ldl_share", np.divide, ldl, _apply(np.add, chol, EPS))
+        put("tg_hdl_ratio", np.divide, tg, hdl_eps)
+        put("lipid_sum", np.add, chol, tg)
+        del hdl_eps
+        put(
+            "lipid_burden", np.add,
+            _apply(np.add, d("ldl_hdl_ratio"), d("tg_hdl_ratio")), d("chol_hdl_ratio"),
+        )
+
+    # Lifestyle Features
+    if has("age", "bmi"):
+        put("age_bmi_risk", np.multiply, r("age"), r("bmi"))
+
+    if has("age", "physical_activity"):
+        age, activity = r("age"), r("physical_activity")
+        put("activity_age_ratio", np.divide, activity, _apply(np.add, age, EPS))
+        put("activity_x_age", np.multiply, activity, age)
+
+    if has("screen_time", "physical_activity"):
+        put(
+            "screen_activity_ratio", np.divide,
+            r("screen_time"), _apply(np.add, r("physical_activity"), EPS),
+        )
+
+    # lifestyle composite score; absent terms are a literal 0 and drop out
+    score = None
+    for coef, col, sign in LIFESTYLE_TERMS:
+        if col not in raw:
+            continue
+        term = _apply(np.multiply, coef, r(col))
+        if score is None:
+            score = term if sign > 0 else _apply(np.negative, term)
+        else:
+            score = _apply(np.add if sign > 0 else np.subtract, score, term)
+    if score is None:
+        score = (np.zeros(len(buf)), np.dtype(np.float64))
+    put("lifestyle_risk_score", np.positive, score)
+    del score
+
+    # History / Risk Combinations
+    history = [r(c) for c in ("hypertension_history", "cardiovascular_history") if c in raw]
+    if len(history) == 2:
+        put("risk_history", np.add, *history)
+    elif history:
+        put("risk_history", np.positive, *history)
+
+    if has("family_history", "bmi"):
+        put("genetic_history_risk", np.multiply, r("family_history"), r("bmi"))
+
+    if has("age"):
+        put("age_map_risk", np.multiply, r("age"), d("mean_arterial_pressure"))
+
+    return dtypes
+
+
+def compute_derived_features(raw: dict, n_rows: int, buf_dtype=None):
+    """
+        Single-pass feature kernel.
+
+        Computes every derived feature into one preallocated, column-major
+        (n_rows, len(DERIVED_FEATURES)) buffer and cleans inf/NaN on those
+        columns only. Returns (buffer, dtypes); dtypes maps each feature to
+        the dtype create_features_pandas gives it.
+
+        buf_dtype defaults to the narrowest float that holds every column
+        exactly; passing it skips the dtype resolution pass.
+    """
+    if buf_dtype is None:
+        # Dry run on empty inputs resolves the output dtypes before allocating
+        empty = {col: values[:0] for col, values in raw.items()}
+        dtypes = _run_kernel(empty, np.zeros((0, len(DERIVED_FEATURES)), order="F"))
+        buf_dtype = np.result_type(np.float32, *dtypes.values())
+
+    buf = np.zeros((n_rows, len(DERIVED_FEATURES)), dtype=buf_dtype, order="F")
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        dtypes = _run_kernel(raw, buf)
+
+    # Cleanups (derived columns only)
+    for j in range(buf.shape[1]):
+        column = buf[:, j]
+        np.copyto(column, 0, where=~np.isfinite(column))
+
+    return buf, dtypes
+
+
+def _clean_raw_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Applies the inf/NaN cleanup to raw columns that actually need it.
+        Returns df untouched (no copy) in the common all-finite case.
+    """
+    cleaned = {}
+    for col in df.columns:
+        s = df[col]
+        kind = s.dtype.kind
+        if kind in "iub":
+            continue
+        if kind == "f":
+            if np.isfinite(s.to_numpy()).all():
+                continue
+            cleaned[col] = s.replace([np.inf, -np.inf], np.nan).fillna(0)
+        else:
+            fixed = s.replace([np.inf, -np.inf], np.nan).fillna(0)
+            if not fixed.equals(s):
+                cleaned[col] = fixed
+
+    return df.assign(**cleaned) if cleaned else df
+
+
 def create_features(df: pd.DataFrame) -> pd.DataFrame:
     """
         Adds engineered feature column to dataframe.
         Returns a new dataframe ( does not mutate original).
+
+        Columns, order, dtypes and values match create_features_pandas on
+        the float64 frame; float32 raw columns only change their own dtype.
+    """
+    raw = read_feature_inputs(df)
+    buf, dtypes = compute_derived_features(raw, len(df))
+
+    derived = pd.DataFrame(buf, index=df.index, columns=DERIVED_FEATURES, copy=False)
+    casts = {name: dtype for name, dtype in dtypes.items() if dtype != buf.dtype}
+    if casts:
+        derived = derived.astype(casts)
+
+    # Re-running on an already featured frame overwrites columns in place
+    existing = [c for c in DERIVED_FEATURES if c in df.columns]
+    base = _clean_raw_columns(df.drop(columns=existing) if existing else df)
+    result = pd.concat([base, derived], axis=1)
+
+    if existing:
+        order = list(df.columns) + [c for c in DERIVED_FEATURES if c not in df.columns]
+        result = result[order]
+
+    return result
+
+
+def create_features_pandas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Reference pandas implementation of create_features.
+        Kept for parity checks and benchmarks.
     """
     df = df.copy()
 
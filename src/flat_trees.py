@@ -0,0 +1,578 @@
+# src/flat_trees.py
+
+import io
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+import zipfile
+import numpy as np
+from src.exception import CustomException
+
+from .config import MODEL_DIR, ENSEMBLE_WEIGHTS, FLAT_ENSEMBLE_FILE, FLAT_ENSEMBLE_MMAP, FLAT_ENSEMBLE_QUANTIZED
+from .models import lightgbm_booster
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on (rows x trees) traversed at once; keeps the node-index
+# working set around 16 MB whatever the batch size.
+TRAVERSE_BLOCK = 2 ** 21
+
+# Batches with at most this many (row x threshold) pairs are quantized by
+# comparing every row against every threshold at once; larger ones by one
+# binary search per column, whose per-call overhead they amortize.
+QUANTIZE_COMPARE_LIMIT = 2 ** 15
+
+# Quantized scoring is used for batches of at least this many rows; on
+# smaller ones quantizing costs more than the narrower node reads save.
+QUANTIZE_MIN_ROWS = 256
+
+# Saved arrays start on NPY_ALIGN-byte file offsets so they can be
+# memory-mapped aligned; the padding goes in a zip extra field with the ID
+# Android's zipalign uses.
+NPY_ALIGN = 64
+ZIP_ALIGN_EXTRA_ID = 0xD935
+
+
+# Flat tree format
+# ----------------
+# Every tree of every fold model is stored in one set of node arrays:
+#
+#     feature[i]       column tested at node i
+#     threshold[i]     go left when x <= threshold[i]
+#     default_left[i]  direction taken for NaN
+#     children[2*i]    right child, children[2*i + 1] left child
+#     value[i]         leaf value (0 for split nodes)
+#
+# Leaves point back to themselves, so a fixed number of steps walks every
+# row to its leaf. Library split rules are rewritten into the single
+# "x <= threshold" rule at export time:
+#
+#     LightGBM  x <= t on float64 input
+#     XGBoost   x < t on float32 input  ->  x32 <= nextafter(t, -inf)
+#     CatBoost  x > border on float32 input  ->  x32 <= border
+#
+# Trees that compare float32 values read from a float32-rounded copy of the
+# columns (feature index + n_features), so the integer paths match the
+# libraries exactly. Each fold model is a group with its own scale and bias;
+# the ensemble probability is sum(weight_g * sigmoid(scale_g * margin_g + bias_g)).
+#
+# Quantized scoring: the split thresholds tested on column c, over all trees
+# of all fold models, form one sorted list T_c (bin_thresholds, sliced by
+# bin_offsets), and every split node keeps the index j of its threshold
+# (qthreshold). A batch is quantized once into bin(x) = #{t in T_c : t < x},
+# and x <= T_c[j] exactly when bin(x) <= j, so trees walked on the uint8 /
+# uint16 bins reach the same leaves as on the float64 values. NaN gets the
+# bin dtype's largest value, which no node threshold reaches.
+
+
+def quantize_thresholds(feature, threshold, n_columns):
+    """
+    (bin_thresholds, bin_offsets, qthreshold) for the split nodes' thresholds.
+    Leaves (infinite threshold) get qthreshold 0; they never move.
+    """
+    split = np.flatnonzero(np.isfinite(threshold))
+    order = split[np.lexsort((threshold[split], feature[split]))]
+    col, thr = feature[order].astype(np.int64), threshold[order]
+
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (col[1:] != col[:-1]) | (thr[1:] != thr[:-1])
+    unique_index = np.cumsum(new) - 1
+    bin_thresholds = thr[new]
+    bin_offsets = np.searchsorted(col[new], np.arange(n_columns + 1))
+
+    counts = np.diff(bin_offsets)
+    most = int(counts.max(initial=0))
+    dtype = np.uint8 if most < np.iinfo(np.uint8).max else np.uint16 if most < np.iinfo(np.uint16).max else np.uint32
+
+    qthreshold = np.zeros(len(threshold), dtype=dtype)
+    qthreshold[order] = unique_index - bin_offsets[col]
+    return bin_thresholds, bin_offsets, qthreshold
+
+
+def _tree(feature, threshold, default_left, left, right, value):
+    return {
+        "feature": np.asarray(feature, dtype=np.int32),
+        "threshold": np.asarray(threshold, dtype=np.float64),
+        "default_left": np.asarray(default_left, dtype=bool),
+        "left": np.asarray(left, dtype=np.int32),
+        "right": np.asarray(right, dtype=np.int32),
+        "value": np.asarray(value, dtype=np.float64),
+    }
+
+
+def _lightgbm_trees(booster):
+    dump = booster.dump_model()
+    if dump["num_tree_per_iteration"] != 1:
+        raise CustomException("Only binary LightGBM models can be flattened", sys)
+
+    objective = dump["objective"].split()
+    scale = 1.0
+    for token in objective[1:]:
+        if token.startswith("sigmoid:"):
+            scale = float(token.split(":")[1])
+
+    trees = []
+    for info in dump["tree_info"]:
+        nodes = []
+
+        def visit(node):
+            i = len(nodes)
+            nodes.append(None)
+            if "leaf_value" in node:
+                nodes[i] = (0, np.inf, True, i, i, node["leaf_value"])
+                return i
+            if node["decision_type"] != "<=" or node["missing_type"] == "Zero":
+                raise CustomException(
+                    f"Unsupported LightGBM split: {node['decision_type']} / {node['missing_type']}", sys
+                )
+            threshold = node["threshold"]
+            if node["missing_type"] == "NaN":
+                default_left = node["default_left"]
+            else:
+                default_left = 0.0 <= threshold  # NaN is scored as 0.0
+            left = visit(node["left_child"])
+            right = visit(node["right_child"])
+            nodes[i] = (node["split_feature"], threshold, default_left, left, right, 0.0)
+            return i
+
+        visit(info["tree_structure"])
+        trees.append(_tree(*zip(*nodes)))
+
+    return trees, scale, 0.0, False
+
+
+def _xgboost_trees(model):
+    booster = model.get_booster()
+    config = json.loads(booster.save_raw("json"))["learner"]
+    if config["objective"]["name"] != "binary:logistic":
+        raise CustomException(f"Unsupported XGBoost objective {config['objective']['name']}", sys)
+
+    base_score = float(config["learner_model_param"]["base_score"].strip("[]"))
+    bias = float(np.log(base_score / (1.0 - base_score)))
+
+    trees = config["gradient_booster"]["model"]["trees"]
+    try:
+        trees = trees[: model.best_iteration + 1]
+    except AttributeError:
+        pass
+
+    flat = []
+    for tree in trees:
+        left = np.asarray(tree["left_children"])
+        right = np.asarray(tree["right_children"])
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        if any(tree["split_type"]):
+            raise CustomException("Categorical XGBoost splits cannot be flattened", sys)
+
+        leaf = left == -1
+        idx = np.arange(len(left))
+        flat.append(_tree(
+            feature=np.where(leaf, 0, tree["split_indices"]),
+            threshold=np.where(leaf, np.inf, np.nextafter(cond, np.float32(-np.inf))),
+            default_left=np.asarray(tree["default_left"], dtype=bool),
+            left=np.where(leaf, idx, left),
+            right=np.where(leaf, idx, right),
+            value=np.where(leaf, cond, 0.0),
+        ))
+
+    return flat, 1.0, bias, True
+
+
+def _catboost_trees(model):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as f:
+            dump = json.load(f)
+
+    float_features = dump["features_info"]["float_features"]
+    column = {f["feature_index"]: f["flat_feature_index"] for f in float_features}
+    nan_left = {f["feature_index"]: f.get("nan_value_treatment") != "AsTrue" for f in float_features}
+
+    scale, bias = dump["scale_and_bias"]
+    bias = bias[0] if isinstance(bias, list) else bias
+
+    trees = []
+    for tree in dump["oblivious_trees"]:
+        splits = tree.get("splits") or []
+        if any(s["split_type"] != "FloatFeature" for s in splits):
+            raise CustomException("Only float-feature CatBoost splits can be flattened", sys)
+        leaf_values = tree["leaf_values"]
+        depth = len(splits)
+
+        # Leaf index bit d is set when split d is true (x > border). Expand the
+        # oblivious tree into a full binary tree testing the splits in order.
+        nodes = []
+
+        def build(level, leaf_index):
+            i = len(nodes)
+            nodes.append(None)
+            if level == depth:
+                nodes[i] = (0, np.inf, True, i, i, leaf_values[leaf_index])
+                return i
+            split = splits[level]
+            f = split["float_feature_index"]
+            left = build(level + 1, leaf_index)
+            right = build(level + 1, leaf_index | (1 << level))
+            border = float(np.float32(split["border"]))
+            nodes[i] = (column[f], border, nan_left[f], left, right, 0.0)
+            return i
+
+        build(0, 0)
+        trees.append(_tree(*zip(*nodes)))
+
+    return trees, float(scale), float(bias), True
+
+
+def export_trees(model):
+    """
+    (trees, scale, bias, float32_input) for one fitted fold model.
+    """
+    booster = lightgbm_booster(model)
+    if booster is not None:
+        return _lightgbm_trees(booster)
+    if hasattr(model, "get_booster"):
+        return _xgboost_trees(model)
+    if hasattr(model, "get_all_params"):
+        return _catboost_trees(model)
+    raise CustomException(f"Cannot flatten {type(model).__name__}", sys)
+
+
+def _node_levels(children, roots):
+    """
+    Depth of every node and the tree it belongs to, walking down from the roots.
+    """
+    children = children.reshape(-1, 2)
+    depth = np.full(len(children), -1, dtype=np.int64)
+    tree = np.empty(len(children), dtype=np.int64)
+    frontier = roots.astype(np.int64)
+    depth[frontier] = 0
+    tree[frontier] = np.arange(len(roots))
+    level = 0
+    while len(frontier):
+        level += 1
+        kids = children[frontier].ravel()
+        owner = np.repeat(tree[frontier], 2)
+        new = depth[kids] == -1  # leaves point back to themselves
+        frontier = kids[new]
+        depth[frontier] = level
+        tree[frontier] = owner[new]
+    return depth, tree
+
+
+class FlatTreeEnsemble:
+    """
+    The weighted fold-model ensemble as flat node arrays, scored with NumPy only.
+    """
+
+    ARRAYS = (
+        "feature", "threshold", "default_left", "children", "value",
+        "tree_root", "tree_group", "n_active", "group_scale", "group_bias", "group_weight",
+    )
+    # written since quantized scoring; derived from the node arrays when absent
+    QUANT_ARRAYS = ("bin_thresholds", "bin_offsets", "qthreshold")
+
+    def __init__(self, feature_names, meta=None, **arrays):
+        self.feature_names = list(feature_names)
+        self.meta = dict(meta or {})
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+        if all(name in arrays for name in self.QUANT_ARRAYS):
+            self.bin_thresholds, self.bin_offsets, self.qthreshold = (arrays[k] for k in self.QUANT_ARRAYS)
+        else:
+            self.bin_thresholds, self.bin_offsets, self.qthreshold = quantize_thresholds(
+                self.feature, self.threshold, 2 * len(self.feature_names)
+            )
+        self._nan_bin = np.iinfo(self.qthreshold.dtype).max
+        self._bin_column = np.repeat(np.arange(len(self.bin_offsets) - 1), np.diff(self.bin_offsets))
+
+        n_groups = len(self.group_weight)
+        self._group_matrix = np.zeros((len(self.tree_root), n_groups))
+        self._group_matrix[np.arange(len(self.tree_root)), self.tree_group] = 1.0
+
+    @classmethod
+    def from_models(cls, models, weights, feature_names):
+        """
+        models: {model_name: [fold models]}, weights: {model_name: weight}.
+        """
+        n_features = len(feature_names)
+        parts = {k: [] for k in ("feature", "threshold", "default_left", "children", "value")}
+        roots, groups = [], []
+        scales, biases, group_weights = [], [], []
+        offset = 0
+
+        for model_name, weight in weights.items():
+            folds = models[model_name]
+            for model in folds:
+                trees, scale, bias, float32_input = export_trees(model)
+                group = len(group_weights)
+                scales.append(scale)
+                biases.append(bias)
+                group_weights.append(weight / len(folds))
+
+                for tree in trees:
+                    feature = tree["feature"] + (n_features if float32_input else 0)
+                    children = np.empty(2 * len(feature), dtype=np.int32)
+                    children[0::2] = tree["right"] + offset
+                    children[1::2] = tree["left"] + offset
+
+                    parts["feature"].append(feature)
+                    parts["threshold"].append(tree["threshold"])
+                    parts["default_left"].append(tree["default_left"])
+                    parts["children"].append(children)
+                    parts["value"].append(tree["value"])
+                    roots.append(offset)
+                    groups.append(group)
+                    offset += len(feature)
+
+        arrays = {k: np.concatenate(v) for k, v in parts.items()}
+        roots = np.asarray(roots, dtype=np.int64)
+        node_depth, node_tree = _node_levels(arrays["children"], roots)
+        depths = np.zeros(len(roots), dtype=np.int64)
+        np.maximum.at(depths, node_tree, node_depth)
+
+        # Deepest trees first: step k only has to move the first n_active[k] trees.
+        order = np.argsort(-depths, kind="stable")
+        n_active = np.array([(depths > k).sum() for k in range(depths.max(initial=0))], dtype=np.int64)
+
+        # Store nodes level by level (then by tree) so each step reads one
+        # compact block of the node arrays.
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        perm = np.lexsort((rank[node_tree], node_depth))
+        new_index = np.empty(len(perm), dtype=np.int32)
+        new_index[perm] = np.arange(len(perm), dtype=np.int32)
+        for k in ("feature", "threshold", "default_left", "value"):
+            arrays[k] = arrays[k][perm]
+        arrays["children"] = new_index[arrays["children"].reshape(-1, 2)[perm]].ravel()
+
+        arrays.update(
+            tree_root=new_index[roots[order]],
+            tree_group=np.asarray(groups, dtype=np.int64)[order],
+            n_active=n_active,
+            group_scale=np.asarray(scales),
+            group_bias=np.asarray(biases),
+            group_weight=np.asarray(group_weights),
+        )
+        meta = {"weights": dict(weights), "n_trees": len(roots), "n_nodes": offset}
+        return cls(feature_names, meta=meta, **arrays)
+
+    def quantize(self, X: np.ndarray) -> np.ndarray:
+        """
+        (n, n_features) float64 matrix -> (2 * n_features, n) bin indices: the
+        float64 columns, then the float32-rounded ones. Columns no split
+        tests are left 0.
+        """
+        n = len(X)
+        columns = np.concatenate([X, X.astype(np.float32)], axis=1).T
+        offsets = self.bin_offsets
+
+        if n * len(self.bin_thresholds) <= QUANTIZE_COMPARE_LIMIT:
+            below = np.zeros((len(self.bin_thresholds) + 1, n), dtype=np.int32)
+            np.cumsum(columns[self._bin_column] > self.bin_thresholds[:, None], axis=0, out=below[1:])
+            Q = (below[offsets[1:]] - below[offsets[:-1]]).astype(self.qthreshold.dtype)
+        else:
+            Q = np.zeros(columns.shape, dtype=self.qthreshold.dtype)
+            for c in np.flatnonzero(np.diff(offsets)):
+                Q[c] = np.searchsorted(self.bin_thresholds[offsets[c]:offsets[c + 1]], columns[c], side="left")
+
+        Q[np.isnan(columns)] = self._nan_bin
+        return Q
+
+    def margins(self, X: np.ndarray, quantized=FLAT_ENSEMBLE_QUANTIZED) -> np.ndarray:
+        """
+        (n, n_features) feature matrix -> (n, n_groups) raw fold-model scores.
+        With `quantized`, batches of QUANTIZE_MIN_ROWS rows or more are
+        quantized once and the trees walked on the bins (same result).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != len(self.feature_names):
+            raise CustomException(
+                f"Expected {len(self.feature_names)} features, got {X.shape[1]}", sys
+            )
+
+        n_trees = len(self.tree_root)
+        step = max(1, TRAVERSE_BLOCK // max(n_trees, 1))
+        out = np.empty((len(X), len(self.group_weight)))
+        quantized = quantized and len(X) >= QUANTIZE_MIN_ROWS
+        Q = self.quantize(X) if quantized else None
+        for start in range(0, len(X), step):
+            block = Q[:, start:start + step] if quantized else X[start:start + step]
+            out[start:start + step] = self._margins_block(block, quantized).T
+        return out
+
+    def _margins_block(self, block, quantized):
+        # Column-major: float64 columns, then the same columns rounded to float32.
+        # Value of column f for row r sits at f * n + r.
+        if quantized:
+            n = block.shape[1]
+            Xc, threshold = block.ravel(), self.qthreshold
+            check_nan = bool((Xc == self._nan_bin).any())
+        else:
+            n = len(block)
+            Xc = np.concatenate([block, block.astype(np.float32).astype(np.float64)], axis=1).T.ravel()
+            threshold = self.threshold
+            check_nan = bool(np.isnan(block).any())
+        rows = np.arange(n, dtype=np.int32)
+
+        # One row of node indices per tree, so the active trees are a contiguous prefix.
+        node = np.repeat(self.tree_root[:, None], n, axis=1)
+        for active in self.n_active:
+            cur = node[:active]
+            x = Xc[self.feature[cur] * n + rows]
+            go_left = x <= threshold[cur]
+            if check_nan:
+                nan = x == self._nan_bin if quantized else np.isnan(x)
+                go_left[nan] = self.default_left[cur[nan]]
+            cur *= 2
+            cur += go_left
+            np.take(self.children, cur, out=cur)
+
+        return self._group_matrix.T @ self.value[node]
+
+    def predict_proba(self, X: np.ndarray, quantized=FLAT_ENSEMBLE_QUANTIZED) -> np.ndarray:
+        """
+        Weighted ensemble probability for each row of the feature matrix.
+        """
+        z = self.margins(X, quantized) * self.group_scale + self.group_bias
+        return (1.0 / (1.0 + np.exp(-z))) @ self.group_weight
+
+    def save(self, path=FLAT_ENSEMBLE_FILE):
+        meta = dict(self.meta, feature_names=self.feature_names)
+        tmp = f"{path}.tmp.npz"
+        names = self.ARRAYS + self.QUANT_ARRAYS
+        members = {"meta": np.array(json.dumps(meta)), **{k: getattr(self, k) for k in names}}
+        with open(tmp, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_STORED) as zf:
+            for name, arr in members.items():
+                _write_aligned_member(zf, f, name, arr)
+        os.replace(tmp, path)
+        logger.info(f"Saved flat ensemble ({self.meta.get('n_trees')} trees) -> {path}")
+
+    @classmethod
+    def load(cls, path=FLAT_ENSEMBLE_FILE, mmap=False):
+        """
+        With mmap, the node arrays are read-only views of the file, so every
+        process that loads it shares one copy in the page cache.
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            names = [k for k in cls.ARRAYS + cls.QUANT_ARRAYS if k in data.files]
+            arrays = _npz_memmap(path, names) if mmap else {k: data[k] for k in names}
+        return cls(meta.pop("feature_names"), meta=meta, **arrays)
+
+
+def _write_aligned_member(zf, f, name, arr):
+    """
+    Writes arr as an uncompressed .npz member whose data starts on a
+    NPY_ALIGN boundary, padding the zip extra field (as zipalign does), so
+    memory-mapped arrays are aligned. np.load ignores the padding.
+    """
+    buf = io.BytesIO()
+    np.lib.format.write_array(buf, np.asanyarray(arr), allow_pickle=False)
+    info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+    # .npy headers are padded to 64 bytes, so aligning the member aligns the data
+    start = f.tell() + 30 + len(info.filename.encode()) + 4
+    pad = -start % NPY_ALIGN
+    info.extra = struct.pack("<HH", ZIP_ALIGN_EXTRA_ID, pad) + bytes(pad)
+    zf.writestr(info, buf.getbuffer())
+
+
+def _npz_memmap(path, names):
+    """
+    Memory-maps members of an uncompressed .npz (as np.savez writes them).
+    """
+    arrays, unaligned = {}, []
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for name in names:
+            info = zf.getinfo(f"{name}.npy")
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise CustomException(f"{path}: {name} is compressed and cannot be memory-mapped", sys)
+
+            # local file header: 30 fixed bytes, then the file name and extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            order = "F" if fortran else "C"
+            arrays[name] = np.asarray(np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order=order))
+            if not arrays[name].flags.aligned:
+                # written before save() aligned its members; unaligned reads are much slower
+                arrays[name] = np.array(arrays[name])
+                unaligned.append(name)
+
+    if unaligned:
+        logger.warning(f"{path}: copied unaligned arrays {unaligned} instead of mapping them; re-run --compile")
+    return arrays
+
+
+def model_sources(model_dir=MODEL_DIR, weights=ENSEMBLE_WEIGHTS):
+    """
+    {relative path: [size, mtime_ns]} for the fold models an ensemble uses.
+    """
+    sources = {}
+    for model_name in weights:
+        folder = os.path.join(model_dir, model_name)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".pkl"):
+                st = os.stat(os.path.join(folder, name))
+                sources[f"{model_name}/{name}"] = [st.st_size, st.st_mtime_ns]
+    return sources
+
+
+def compile_models(model_dir=MODEL_DIR, weights=None, path=FLAT_ENSEMBLE_FILE):
+    """
+    Loads the saved fold models and writes them out as one FlatTreeEnsemble,
+    weighted by the blend spec (src/blend.py) unless `weights` is given.
+    """
+    from .registry import load_models
+    from .predictor import model_feature_names
+    from .blend import load_ensemble_spec
+
+    if weights is None:
+        spec = load_ensemble_spec()
+        if spec["method"] != "blend":
+            raise CustomException(f"Flat export needs blend weights, the ensemble spec is {spec['method']}", sys)
+        weights = spec["weights"]
+
+    try:
+        models = load_models(weights, model_dir)
+        feature_names = model_feature_names(models[next(iter(weights))][0])
+        for model_name, folds in models.items():
+            if any(model_feature_names(m) != feature_names for m in folds):
+                raise CustomException(f"{model_name} fold models were trained on different features", sys)
+
+        flat = FlatTreeEnsemble.from_models(models, weights, feature_names)
+        flat.meta["sources"] = model_sources(model_dir, weights)
+        flat.save(path)
+        return flat
+    except CustomException:
+        raise
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_flat_ensemble(path=FLAT_ENSEMBLE_FILE, model_dir=MODEL_DIR, mmap=FLAT_ENSEMBLE_MMAP):
+    """
+    Loads a compiled ensemble, warning if the fold models changed since export.
+    """
+    flat = FlatTreeEnsemble.load(path, mmap=mmap)
+    sources = flat.meta.get("sources")
+    if sources is not None and sources != model_sources(model_dir, flat.meta["weights"]):
+        logger.warning(f"{path} is older than the models in {model_dir}; re-run --compile")
+    return flat
@@ -0,0 +1,116 @@
+# src/incremental.py
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+from src.exception import CustomException
+import sys
+
+from .config import MODEL_DIR, SUBMISSION_DIR, TEST_FILE, INCREMENTAL_STATE_FILE, TARGET_COL
+from .storage import load_processed_frame
+from .dedup import row_fingerprints
+from .features import build_test_matrix
+from .registry import model_set_version
+from .blend import load_ensemble_spec
+from .ensemble import load_ensemble_models, predict_ensemble
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+# Incremental scoring keeps, for every id of the last scored test file, a
+# 64-bit fingerprint of its raw column values and its ensemble probability,
+# together with the version of the model set that produced them. A run
+# fingerprints the whole file, builds features and predicts only for ids that
+# are new or whose fingerprint changed, and takes the rest from the state.
+# The version (registry.model_set_version) covers the fold pickles in
+# MODEL_DIR, the ensemble spec and the feature code, so retraining, a new
+# blend or a features.py edit re-scores everything. Features are computed
+# row by row, which is what makes scoring a subset give the same values as a
+# full run.
+
+
+def _id_array(ids):
+    ids = np.asarray(ids)
+    # object ids are stored as strings so the state loads without pickle
+    return ids.astype(str) if ids.dtype == object else ids
+
+
+def load_state(version, path=INCREMENTAL_STATE_FILE):
+    """
+    {"id", "fingerprint", "proba"} arrays of the last run, or None when
+    there is none or it was scored by a different model set.
+    """
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        if str(data["version"]) != version:
+            logger.info("Model set changed since the last incremental run; re-scoring every row")
+            return None
+        return {key: data[key] for key in ("id", "fingerprint", "proba")}
+
+
+def save_state(ids, fingerprints, proba, version, path=INCREMENTAL_STATE_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp.npz")
+    np.savez(tmp, id=ids, fingerprint=fingerprints, proba=proba, version=np.array(version))
+    os.replace(tmp, path)
+
+
+def run_ensemble_incremental(model_dir=MODEL_DIR, test_file=TEST_FILE, submission_dir=SUBMISSION_DIR,
+                             state_path=INCREMENTAL_STATE_FILE):
+    """
+    Writes the same submission as run_ensemble, re-scoring only the rows
+    that changed since the last incremental run. Returns its path.
+    """
+    spec = load_ensemble_spec()
+    version = model_set_version(model_dir, spec)
+
+    with span("load_processed") as s:
+        df = load_processed_frame(test_file)
+        s["rows"] = len(df)
+    ids = _id_array(df["id"])
+    if not pd.Index(ids).is_unique:
+        raise CustomException(f"Incremental scoring needs unique ids; {test_file} has duplicates", sys)
+
+    with span("fingerprint_rows", rows=len(df)):
+        fingerprints = row_fingerprints(df, exclude=["id", TARGET_COL])
+
+    proba = np.empty(len(df))
+    todo = np.ones(len(df), dtype=bool)
+    state = load_state(version, state_path)
+    if state is not None:
+        pos = pd.Index(state["id"]).get_indexer(ids)
+        hit = pos >= 0
+        hit[hit] = state["fingerprint"][pos[hit]] == fingerprints[hit]
+        proba[hit] = state["proba"][pos[hit]]
+        todo = ~hit
+
+    n_todo = int(todo.sum())
+    logger.info(f"{n_todo} of {len(df)} rows new or changed")
+
+    if n_todo:
+        with span("load_models"):
+            ensemble_models = load_ensemble_models(model_dir, spec)
+        changed = df if n_todo == len(df) else df.iloc[np.flatnonzero(todo)]
+        with span("build_test_matrix", rows=n_todo):
+            X_changed, _ = build_test_matrix(changed)
+        with span("predict", rows=n_todo):
+            proba[todo] = predict_ensemble(ensemble_models, X_changed, spec)
+
+    submission = pd.DataFrame({
+        "id": df["id"],
+        "diagnosed_diabetes": proba
+    })
+
+    submission_dir.mkdir(parents=True, exist_ok=True)
+    save_path = submission_dir / "submission.csv"
+    with span("write_csv", rows=len(submission)):
+        submission.to_csv(save_path, index=False)
+
+    # only ids of this file are kept, so dropped records leave the state
+    save_state(ids, fingerprints, proba, version, state_path)
+
+    logger.info(f"Submission saved -> {save_path}")
+    return save_path
@@ -1,14 +1,17 @@
-import pandas as pd
 import logging
 from pathlib import Path
-from .config import RAW_DATA_DIR, PROCESSED_DATA_DIR, TRAIN_FILE, TEST_FILE
+from .config import RAW_DATA_DIR, PROCESSED_DATA_DIR, TRAIN_FILE, TEST_FILE, DEDUP_OUT_OF_CORE, DEDUP_TRAIN_FILE
+from .storage import save_processed_frame
+from .schema import read_typed_csv
+from .dedup import drop_duplicate_rows, dedup_csv
+from .tracing import span
 from src.exception import CustomException
 import sys
 
 logger = logging.getLogger(__name__)
 
 
-def load_raw_data():
+def load_raw_data(out_of_core_dedup=DEDUP_OUT_OF_CORE):
     try:
         train_path = RAW_DATA_DIR / "train.csv"
         test_path = RAW_DATA_DIR / "test.csv"
@@ -19,8 +22,13 @@ def load_raw_data():
         if not test_path.exists():
             raise CustomException(f"Missing file: {test_path}")
 
-        train_df = pd.read_csv(train_path)
-        test_df = pd.read_csv(test_path)
+        if out_of_core_dedup:
+            with span("dedup_csv"):
+                dedup_csv(train_path, DEDUP_TRAIN_FILE)
+            train_path = DEDUP_TRAIN_FILE
+
+        train_df = read_typed_csv(train_path)
+        test_df = read_typed_csv(test_path)
 
         return train_df, test_df
 
@@ -28,7 +36,7 @@ def load_raw_data():
         raise CustomException(e, sys)
 
 
-def basic_quality_check(train_df, test_df):
+def basic_quality_check(train_df, test_df, dedup=True):
     try:
         if train_df.empty:
             raise CustomException("Training dataframe is empty")
@@ -39,8 +47,8 @@ def basic_quality_check(train_df, test_df):
         if "diagnosed_diabetes" not in train_df.columns:
             raise CustomException("Target column 'diagnosed_diabetes' missing in train dataset")
         
-        if train_df.duplicated().sum() > 0:
-            train_df.drop_duplicates(inplace=True)
+        if dedup:
+            train_df, _ = drop_duplicate_rows(train_df)
 
         return train_df, test_df
 
@@ -50,21 +58,26 @@ def basic_quality_check(train_df, test_df):
 def save_processed(train_df, test_df):
     PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    train_df.to_csv(TRAIN_FILE, index=False)
-    test_df.to_csv(TEST_FILE, index=False)
+    train_path = save_processed_frame(train_df, TRAIN_FILE)
+    test_path = save_processed_frame(test_df, TEST_FILE)
 
-    logger.info(f"Processed train saved -> {TRAIN_FILE}")
-    logger.info(f"Processed test saved -> {TEST_FILE}")
+    logger.info(f"Processed train saved -> {train_path}")
+    logger.info(f"Processed test saved -> {test_path}")
 
-def run_ingestion():
+def run_ingestion(out_of_core_dedup=DEDUP_OUT_OF_CORE):
     logger.info("Loading raw data...")
-    train_df, test_df = load_raw_data()
+    with span("load_raw") as s:
+        train_df, test_df = load_raw_data(out_of_core_dedup)
+        s["rows"] = len(train_df) + len(test_df)
 
     logger.info("Running quality checks...")
-    train_df, test_df = basic_quality_check(train_df, test_df)
+    with span("quality_check"):
+        # the train CSV was already deduplicated on disk
+        train_df, test_df = basic_quality_check(train_df, test_df, dedup=not out_of_core_dedup)
 
     logger.info("Saving processed data...")
-    save_processed(train_df, test_df)
+    with span("save_processed"):
+        save_processed(train_df, test_df)
 
     logger.info("Ingestion completed successfully.")
 
@@ -1,32 +1,112 @@
 import argparse
+from contextlib import nullcontext
 from .utils import info
-from .ingest import run_ingestion
-from .train import run_training
-from .ensemble import run_ensemble
+from .config import ENSEMBLE_CHUNK_SIZE, ENSEMBLE_INCREMENTAL, ENSEMBLE_METHOD, TRACE_ENABLED, PROFILE_STAGES
+from .tracing import start_trace, span
 
 
+# Stages are imported when they run, so e.g. --ingest never loads the model
+# libraries and --help starts without pandas or sklearn.
 def run_pipeline(args):
-    if args.ingest:
-        info("Running ingestion stage...")
-        run_ingestion()
+    trace = start_trace("pipeline", profile=args.profile) if TRACE_ENABLED else nullcontext()
 
-    if args.train:
-        info("Running model training...")
-        run_training()
+    with trace:
+        if args.ingest:
+            from .ingest import run_ingestion
 
-    if args.ensemble:
-        info("Running ensemble + submission generation...")
-        run_ensemble()
+            info("Running ingestion stage...")
+            with span("ingest"):
+                run_ingestion()
+
+        if args.tune:
+            from .tuning import run_tuning
+
+            info("Running hyperparameter search...")
+            with span("tune"):
+                run_tuning()
+
+        if args.train and args.out_of_core:
+            from .train_out_of_core import run_training_out_of_core
+
+            info("Running out-of-core model training...")
+            with span("train"):
+                run_training_out_of_core()
+
+        elif args.train:
+            from .train import run_training
+
+            info("Running model training...")
+            with span("train"):
+                run_training()
+
+        if args.blend:
+            from .blend import run_weight_search
+
+            info("Searching ensemble weights on the OOF predictions...")
+            with span("blend"):
+                run_weight_search(method=args.blend_method)
+
+        if args.ensemble:
+            from .ensemble import run_ensemble
+
+            info("Running ensemble + submission generation...")
+            with span("ensemble"):
+                run_ensemble(chunk_size=args.chunk_size, incremental=args.incremental)
+
+        if args.compile:
+            from .flat_trees import compile_models
+
+            info("Compiling fold models into a flat tree ensemble...")
+            with span("compile"):
+                compile_models()
 
 
 def get_args():
     parser = argparse.ArgumentParser(description="Diabetes ML Pipeline")
 
     parser.add_argument("--ingest", action="store_true", help="Run ingestion pipeline")
+    parser.add_argument("--tune", action="store_true", help="Search model hyperparameters (used by --train)")
     parser.add_argument("--train", action="store_true", help="Train models")
+    parser.add_argument(
+        "--out-of-core",
+        action="store_true",
+        help="With --train: stream the train file from disk (LightGBM / XGBoost only)",
+    )
+    parser.add_argument("--blend", action="store_true", help="Search ensemble weights on the saved OOF predictions")
+    parser.add_argument(
+        "--blend-method",
+        choices=["blend", "stack"],
+        default=ENSEMBLE_METHOD,
+        help="With --blend: convex weight search or a stacking meta-model",
+    )
     parser.add_argument("--ensemble", action="store_true", help="Generate submission")
+    parser.add_argument("--compile", action="store_true", help="Export fold models as flat NumPy trees")
+    parser.add_argument(
+        "--profile",
+        nargs="*",
+        metavar="STAGE",
+        help="Run these stages (ingest, tune, train, blend, ensemble, compile or all) under cProfile; "
+             "a bare --profile profiles every stage",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=ENSEMBLE_CHUNK_SIZE,
+        help="Score the test file in chunks of this many rows",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=ENSEMBLE_INCREMENTAL,
+        help="With --ensemble: only re-score rows that changed since the last incremental run",
+    )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.profile is None:
+        args.profile = PROFILE_STAGES
+    elif not args.profile:  # bare --profile
+        args.profile = ["all"]
+    return args
 
 
 if __name__ == "__main__":
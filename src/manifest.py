@@ -0,0 +1,115 @@
+# src/manifest.py
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+from .config import MODEL_DIR, CV_FOLDS, SHUFFLE, SEED, EARLY_STOPPING_ROUNDS, MODEL_NAMES
+from .models import params_hash, THREAD_PARAMS
+from .registry import file_stamp
+
+logger = logging.getLogger(__name__)
+
+
+# Run manifest of the training folds: MODEL_DIR/manifest.json holds one entry
+# per (model, fold) with the fingerprint of the training matrix, the hash of
+# the model's parameters and CV settings (plus the thread count for libraries
+# whose trees change with it), the fold's ROC-AUC and the stamp of the saved
+# fold model. The fold's OOF predictions are saved next to its
+# pickle. A fold is recorded only after its model is saved, so a run that
+# dies mid-fold leaves that fold out and a rerun refits it; folds whose entry
+# still matches are read back instead of refitted.
+
+MANIFEST_NAME = "manifest.json"
+
+
+def data_fingerprint(X, y):
+    """
+    Hash of the feature matrix (column names, dtypes and values) and labels.
+    """
+    h = hashlib.blake2b(digest_size=12)
+    for col in X.columns:
+        values = np.ascontiguousarray(X[col].to_numpy())
+        h.update(f"{col}:{values.dtype}".encode())
+        h.update(values.view(np.uint8))
+    h.update(np.ascontiguousarray(np.asarray(y)).view(np.uint8))
+    return h.hexdigest()
+
+
+def fold_threads(model_name, model):
+    """
+    Thread count a fold's trees depend on: always for CatBoost, for LightGBM
+    unless it runs with deterministic=True; XGBoost's hist trees do not.
+    """
+    params = model.get_params()
+    if model_name == MODEL_NAMES["cat"] or (model_name == MODEL_NAMES["lgbm"] and not params.get("deterministic")):
+        return params.get(THREAD_PARAMS[model_name])
+    return None
+
+
+def fold_params_hash(model_name, model, reuse_bins):
+    """
+    Hash of everything besides the data that a fold's result depends on.
+    """
+    return params_hash(
+        model_name, model, CV_FOLDS, SHUFFLE, SEED, EARLY_STOPPING_ROUNDS, bool(reuse_bins),
+        fold_threads(model_name, model),
+    )
+
+
+def load_manifest(model_dir=MODEL_DIR):
+    path = model_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        logger.warning(f"{path} is unreadable; refitting every fold")
+        return {}
+
+
+def _fold_paths(model_name, fold, model_dir):
+    path = model_dir / model_name
+    return path / f"{model_name}_fold{fold}.pkl", path / f"{model_name}_fold{fold}.oof.npy"
+
+
+def completed_fold(manifest, model_name, fold, data_key, param_key, n_val, model_dir=MODEL_DIR):
+    """
+    (val_pred, fold_score) of a fold recorded with the same data and
+    parameters whose files are intact, else None.
+    """
+    entry = manifest.get(f"{model_name}/{fold}")
+    if entry is None or entry["data"] != data_key or entry["params"] != param_key:
+        return None
+
+    model_path, oof_path = _fold_paths(model_name, fold, model_dir)
+    if not model_path.exists() or not oof_path.exists() or list(file_stamp(model_path, "mtime")) != entry["model_stamp"]:
+        return None
+    val_pred = np.load(oof_path)
+    if len(val_pred) != n_val:
+        return None
+    return val_pred, entry["score"]
+
+
+def record_fold(model_name, fold, data_key, param_key, val_pred, fold_score, model_dir=MODEL_DIR):
+    """
+    Saves a finished fold's OOF predictions and adds its manifest entry.
+    """
+    model_path, oof_path = _fold_paths(model_name, fold, model_dir)
+    np.save(oof_path, np.asarray(val_pred))
+
+    manifest = load_manifest(model_dir)
+    manifest[f"{model_name}/{fold}"] = {
+        "data": data_key,
+        "params": param_key,
+        "score": float(fold_score),
+        "model_stamp": list(file_stamp(model_path, "mtime")),
+    }
+    path = model_dir / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
@@ -1,30 +1,150 @@
-from lightgbm import LGBMClassifier
-from xgboost import XGBClassifier
-from catboost import CatBoostClassifier
+import json
+import hashlib
+import logging
+
 from .config import (
     LIGHTGBM_PARAMS,
     XGBOOST_PARAMS,
     CATBOOST_PARAMS,
     MODEL_NAMES,
+    EARLY_STOPPING_ROUNDS,
+    TUNED_PARAMS_FILE,
 )
 
+logger = logging.getLogger(__name__)
+
+# Name of each library's own thread-count parameter
+THREAD_PARAMS = {
+    MODEL_NAMES["lgbm"]: "n_jobs",
+    MODEL_NAMES["xgb"]: "n_jobs",
+    MODEL_NAMES["cat"]: "thread_count",
+}
+
 
+# Each library is imported only when a model of that type is built, so a
+# process fitting one model type never loads the other two.
 def get_lightgbm():
+    from lightgbm import LGBMClassifier
     return LGBMClassifier(**LIGHTGBM_PARAMS)
 
 def get_xgboost():
+    from xgboost import XGBClassifier
     return XGBClassifier(**XGBOOST_PARAMS)
 
 def get_catboost():
+    from catboost import CatBoostClassifier
     return CatBoostClassifier(**CATBOOST_PARAMS)
 
 
-def get_all_models():
+MODEL_FACTORIES = {
+    MODEL_NAMES["lgbm"]: get_lightgbm,
+    MODEL_NAMES["xgb"]: get_xgboost,
+    MODEL_NAMES["cat"]: get_catboost,
+}
+
+
+def load_tuned_params(path=TUNED_PARAMS_FILE):
+    """
+    {model_name: params} written by the hyperparameter search (src/tuning.py).
+    """
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return {name: entry["params"] for name, entry in json.load(f).items()}
+
+
+def get_model(model_name, n_threads=None, tuned=True):
+    """
+    Returns a fresh model, optionally pinned to `n_threads` library threads.
+    With `tuned`, parameters found by --tune override the config defaults.
+    """
+    model = MODEL_FACTORIES[model_name]()
+    if tuned:
+        params = load_tuned_params().get(model_name)
+        if params:
+            model.set_params(**params)
+    if n_threads is not None:
+        model.set_params(**{THREAD_PARAMS[model_name]: n_threads})
+    return model
+
+
+def params_hash(model_name, model, *settings):
+    """
+    Hash of a model's parameters (except its thread count) and any other
+    settings its results depend on.
+    """
+    params = {k: v for k, v in model.get_params().items() if k != THREAD_PARAMS[model_name]}
+    h = hashlib.blake2b(digest_size=12)
+    h.update(json.dumps([model_name, params, *settings], sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def get_all_models(n_threads=None, tuned=True):
+    """
+    Returns dictionary of initalized models (with any tuned parameters).
+    """
+    tuned_names = [name for name in load_tuned_params() if name in MODEL_FACTORIES] if tuned else []
+    if tuned_names:
+        logger.info(f"Using tuned parameters for {tuned_names}")
+    return {name: get_model(name, n_threads, tuned) for name in MODEL_FACTORIES}
+
+
+def early_stopping_fit_params(model_name, model, X_val, y_val, rounds=EARLY_STOPPING_ROUNDS):
+    """
+    Keyword arguments for model.fit that stop training once the validation
+    AUC has not improved for `rounds` rounds and keep the best iteration
+    (empty when rounds is falsy). May set the model's eval metric.
+    """
+    if not rounds:
+        return {}
+
+    if model_name == MODEL_NAMES["lgbm"]:
+        from lightgbm import early_stopping
+
+        model.set_params(metric="auc")
+        return {"eval_set": [(X_val, y_val)], "eval_metric": "auc", "callbacks": [early_stopping(rounds, verbose=False)]}
+
+    if model_name == MODEL_NAMES["xgb"]:
+        model.set_params(eval_metric="auc", early_stopping_rounds=rounds)
+        return {"eval_set": [(X_val, y_val)], "verbose": False}
+
+    # CatBoost drops the trees after the best iteration
+    return {"eval_set": (X_val, y_val), "early_stopping_rounds": rounds, "use_best_model": True}
+
+
+def lightgbm_booster(model):
+    """
+    The LightGBM Booster of a fold model: the model itself when the binned
+    or out-of-core trainers saved a bare Booster, `booster_` of an
+    LGBMClassifier, None for the other libraries.
+    """
+    if hasattr(model, "booster_"):
+        return model.booster_
+    if type(model).__module__.startswith("lightgbm"):
+        return model
+    return None
+
+
+def positive_proba(model, X):
+    """
+    Positive-class probability of a fold model. A bare LightGBM Booster
+    predicts probabilities itself, up to its best iteration.
+    """
+    if hasattr(model, "predict_proba"):
+        return model.predict_proba(X)[:, 1]
+    return model.predict(X)
+
+
+def best_iteration(model):
     """
-    Returns dictionary of initalized models.
+    Number of boosting rounds a fitted model predicts with.
     """
-    return {
-        MODEL_NAMES["lgbm"]:get_lightgbm(),
-        MODEL_NAMES["xgb"]:get_xgboost(),
-        MODEL_NAMES["cat"]:get_catboost(),
-    }
\ No newline at end of file
+    booster = lightgbm_booster(model)
+    if booster is not None:
+        return booster.best_iteration or booster.current_iteration()
+    if hasattr(model, "get_booster"):
+        try:
+            return model.best_iteration + 1
+        except AttributeError:
+            return model.get_booster().num_boosted_rounds()
+    return model.tree_count_
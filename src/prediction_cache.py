@@ -0,0 +1,183 @@
+# src/prediction_cache.py
+
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+
+from .config import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S, PREDICTION_CACHE_DISK_MAX_ROWS
+
+logger = logging.getLogger(__name__)
+
+
+# Ensemble probabilities of recently scored input rows, for clients that
+# send the same payload again (retries, dashboards re-polling, batch
+# resubmits). A key is a hash of the model-set version and the validated raw
+# row (float64, -0.0 and NaN payloads normalized), so a row scored by other
+# models can never match. Entries live in an LRU dict bounded by max_entries
+# and expire after ttl_s; with `path` they are also written to a SQLite file
+# that later processes (or other server workers) read on a memory miss.
+
+
+class PredictionCache:
+    """
+    LRU / TTL cache of probabilities keyed by input row and model version.
+
+        cache = PredictionCache(version)
+        keys = cache.row_keys(raw)
+        proba, missing = cache.get_many(keys)
+        proba[missing] = score(raw[missing])
+        cache.put_many(keys[missing], proba[missing])
+    """
+
+    def __init__(self, version, max_entries=PREDICTION_CACHE_SIZE, ttl_s=PREDICTION_CACHE_TTL_S, path=None,
+                 disk_max_rows=PREDICTION_CACHE_DISK_MAX_ROWS):
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.disk_max_rows = disk_max_rows
+
+        self._entries = OrderedDict()  # key -> (proba, expiry on the monotonic clock)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = self.disk_hits = 0
+
+        self._db = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key BLOB PRIMARY KEY, version TEXT, proba REAL, created REAL)"
+            )
+            self._prune_disk(other_versions=False)
+
+    def row_keys(self, raw):
+        """
+        Object array of one key per row of a 2-D float64 array.
+        """
+        raw = np.where(np.isnan(raw), np.nan, raw + 0.0)
+        prefix = self.version.encode()
+        keys = np.empty(len(raw), dtype=object)
+        for i, row in enumerate(raw):
+            keys[i] = hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest()
+        return keys
+
+    def get_many(self, keys):
+        """
+        (probabilities, missing mask); missing rows hold NaN.
+        """
+        proba = np.full(len(keys), np.nan)
+        missing = np.ones(len(keys), dtype=bool)
+        now = time.monotonic()
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self.expired += 1
+                    continue
+                self._entries.move_to_end(key)
+                proba[i] = entry[0]
+                missing[i] = False
+
+            if self._db is not None and missing.any():
+                found = self._disk_get([keys[i] for i in np.flatnonzero(missing)])
+                wall = time.time()
+                for i in np.flatnonzero(missing):
+                    if keys[i] in found:
+                        proba[i], created = found[keys[i]]
+                        missing[i] = False
+                        self.disk_hits += 1
+                        # keep the disk row's age, so the entry expires when the row does
+                        self._insert(keys[i], proba[i], self._expiry(now - (wall - created)))
+
+            self.hits += int((~missing).sum())
+            self.misses += int(missing.sum())
+        return proba, missing
+
+    def put_many(self, keys, probas):
+        expiry = self._expiry(time.monotonic())
+        with self._lock:
+            for key, p in zip(keys, probas):
+                self._insert(key, float(p), expiry)
+            if self._db is not None and len(keys):
+                created = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                    [(key, self.version, float(p), created) for key, p in zip(keys, probas)],
+                )
+                self._db.commit()
+
+    def _expiry(self, created):
+        return None if self.ttl_s is None else created + self.ttl_s
+
+    def _insert(self, key, proba, expiry):
+        self._entries[key] = (proba, expiry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, keys):
+        found = {}
+        oldest = 0.0 if self.ttl_s is None else time.time() - self.ttl_s
+        # stay below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, proba, created FROM predictions WHERE version = ? AND created > ? "
+                f"AND key IN ({','.join('?' * len(part))})",
+                [self.version, oldest, *part],
+            )
+            found.update((key, (proba, created)) for key, proba, created in rows)
+        return found
+
+    def _prune_disk(self, other_versions):
+        """
+        Drops expired rows, the oldest rows past disk_max_rows and, with
+        other_versions, every row not keyed by this cache's version. Opening
+        a cache only prunes by age, since other processes sharing the file
+        may still serve an older model set.
+        """
+        oldest = 0.0 if self.ttl_s is None else time.time() - self.ttl_s
+        self._db.execute("DELETE FROM predictions WHERE created <= ?", (oldest,))
+        if other_versions:
+            self._db.execute("DELETE FROM predictions WHERE version != ?", (self.version,))
+        self._db.execute(
+            "DELETE FROM predictions WHERE key IN "
+            "(SELECT key FROM predictions ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_rows,),
+        )
+        self._db.commit()
+
+    def invalidate(self, version):
+        """
+        Drops every entry, including disk rows of other model versions, and
+        keys new ones with `version`.
+        """
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.version = version
+            if self._db is not None:
+                self._prune_disk(other_versions=True)
+        logger.info(f"Prediction cache invalidated ({dropped} entries dropped)")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "disk_hits": self.disk_hits,
+            }
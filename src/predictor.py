@@ -0,0 +1,238 @@
+# src/predictor.py
+
+import logging
+import numpy as np
+from src.exception import CustomException
+import sys
+
+from .config import (
+    MODEL_DIR,
+    FLAT_ENSEMBLE_MMAP,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_DISK,
+    PREDICTION_CACHE_FILE,
+)
+from .blend import load_ensemble_spec, combine_probas
+from .features import DERIVED_FEATURES, compute_derived_features
+from .flat_trees import load_flat_ensemble
+from .models import lightgbm_booster
+from .prediction_cache import PredictionCache
+from .schema import RAW_SCHEMA, cast_column
+
+logger = logging.getLogger(__name__)
+
+
+def model_feature_names(model):
+    """
+    Feature names a fitted LightGBM / XGBoost / CatBoost model was trained on.
+    """
+    booster = lightgbm_booster(model)
+    if booster is not None:
+        return [str(n) for n in booster.feature_name()]
+    for attr in ("feature_names_in_", "feature_names_", "feature_name_"):
+        names = getattr(model, attr, None)
+        if names is not None:
+            return [str(n) for n in names]
+    raise CustomException(f"Cannot read feature names from {type(model).__name__}", sys)
+
+
+def fold_scorer(model):
+    """
+    Returns X -> positive-class probability for a fitted fold model.
+    LightGBM and XGBoost are called through their boosters, which skips the
+    sklearn input validation that dominates single-row latency.
+    """
+    booster = lightgbm_booster(model)
+    if booster is not None:
+        return lambda X: booster.predict(X)
+
+    if hasattr(model, "get_booster"):
+        booster = model.get_booster()
+        try:
+            iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            iteration_range = (0, 0)
+        return lambda X: booster.inplace_predict(X, iteration_range=iteration_range)
+
+    return lambda X: model.predict_proba(X)[:, 1]
+
+
+class EnsemblePredictor:
+    """
+    In-process scorer for single patients or small batches.
+
+    Loads every fold model of each type in the ensemble spec (src/blend.py)
+    once and keeps them in memory; `weights` overrides it with a plain
+    blend. Raw fields go straight through the NumPy feature kernel into a
+    float matrix in the models' column order, so no DataFrame is built per
+    request. Probabilities match run_ensemble.
+
+    With flat_path set, the compiled ensemble written by --compile is scored
+    instead (NumPy only, no model libraries or pickles are loaded). It is
+    memory-mapped read-only with flat_mmap, so server workers share it.
+
+    Probabilities of recently scored rows are cached (src/prediction_cache.py)
+    unless cache_size is 0; reload() picks up retrained models and
+    invalidates the cache.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, weights=None, flat_path=None, flat_mmap=FLAT_ENSEMBLE_MMAP,
+                 cache_size=PREDICTION_CACHE_SIZE):
+        self.model_dir = model_dir
+        self._weights_override = weights
+        self.flat_path = flat_path
+        self.flat_mmap = flat_mmap
+        self._load()
+
+        self.cache = None
+        if cache_size:
+            path = PREDICTION_CACHE_FILE if PREDICTION_CACHE_DISK else None
+            self.cache = PredictionCache(self.model_version, max_entries=cache_size, path=path)
+
+    def _load(self):
+        from .registry import model_set_version
+
+        model_dir, weights, flat_path = self.model_dir, self._weights_override, self.flat_path
+        self.flat = None
+        if flat_path is not None:
+            self.flat = load_flat_ensemble(flat_path, model_dir, mmap=self.flat_mmap)
+            self.spec = {"method": "blend", "weights": dict(self.flat.meta["weights"])}
+            self.weights = self.spec["weights"]
+            self.models, self.scorers = {}, {}
+            names = self.flat.feature_names
+        else:
+            from .registry import load_models
+
+            if weights is None:
+                self.spec = load_ensemble_spec()
+            else:
+                self.spec = {"method": "blend", "weights": dict(weights)}
+            self.weights = self.spec["weights"]
+            self.models = load_models(self.weights, model_dir)
+            names = self._check_feature_names()
+            self.scorers = {
+                name: [fold_scorer(m) for m in models] for name, models in self.models.items()
+            }
+
+        self.feature_names = names
+        self.raw_columns = [c for c in names if c not in DERIVED_FEATURES]
+        # derived features are float64, as in the batch path
+        self._x_dtype = np.float64
+
+        self._raw_pos = np.array([names.index(c) for c in self.raw_columns])
+        derived = [c for c in DERIVED_FEATURES if c in names]
+        self._derived_pos = np.array([names.index(c) for c in derived])
+        self._derived_idx = np.array([DERIVED_FEATURES.index(c) for c in derived])
+
+        if self.flat is not None:
+            self.model_version = model_set_version(model_dir, self.spec, self.flat.meta)
+            logger.info(f"Loaded flat ensemble ({self.flat.meta['n_trees']} trees, {len(names)} features)")
+        else:
+            self.model_version = model_set_version(model_dir, self.spec)
+            logger.info(
+                f"Loaded {sum(len(m) for m in self.models.values())} fold models "
+                f"({len(names)} features)"
+            )
+
+    def reload(self):
+        """
+        Re-reads the ensemble spec and the fold models (unchanged pickles come
+        from the registry cache) and invalidates the prediction cache if the
+        model set changed. Returns True when it did.
+        """
+        old = self.model_version
+        self._load()
+        if self.model_version == old:
+            return False
+        if self.cache is not None:
+            self.cache.invalidate(self.model_version)
+        return True
+
+    def _check_feature_names(self):
+        names = None
+        for model_name, models in self.models.items():
+            for model in models:
+                fold_names = model_feature_names(model)
+                if names is None:
+                    names = fold_names
+                elif fold_names != names:
+                    raise CustomException(
+                        f"{model_name} fold models were trained on different features", sys
+                    )
+        return names
+
+    def _check_raw(self, raw) -> np.ndarray:
+        raw = np.asarray(raw, dtype=np.float64)
+        if raw.ndim == 1:
+            raw = raw[None, :]
+        if raw.shape[1] != len(self.raw_columns):
+            raise CustomException(
+                f"Expected {len(self.raw_columns)} raw fields, got {raw.shape[1]}", sys
+            )
+        return raw
+
+    def _check_schema(self, raw: np.ndarray):
+        for j, col in enumerate(self.raw_columns):
+            if col in RAW_SCHEMA:
+                cast_column(col, raw[:, j], source="request")
+
+    def build_features(self, raw: np.ndarray) -> np.ndarray:
+        """
+        (n, len(raw_columns)) raw values -> (n, len(feature_names)) matrix.
+        Values are not range-checked here; that runs per record in
+        record_to_array.
+        """
+        raw = self._check_raw(raw)
+
+        columns = {col: raw[:, j] for j, col in enumerate(self.raw_columns)}
+        derived, _ = compute_derived_features(columns, len(raw), buf_dtype=self._x_dtype)
+
+        X = np.empty((len(raw), len(self.feature_names)), dtype=self._x_dtype)
+        X[:, self._raw_pos] = raw
+        X[:, self._derived_pos] = derived[:, self._derived_idx]
+        return X
+
+    def record_to_array(self, record: dict) -> np.ndarray:
+        """
+        Raw values of one record, checked against RAW_SCHEMA so a bad record
+        fails on its own instead of failing the batch it is scored in.
+        """
+        missing = [c for c in self.raw_columns if c not in record]
+        if missing:
+            raise CustomException(f"Missing fields: {missing}", sys)
+        row = self._check_raw([record[c] for c in self.raw_columns])
+        self._check_schema(row)
+        return row[0]
+
+    def predict_proba(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Ensemble probability for each row of raw values; rows in the
+        prediction cache are not scored again.
+        """
+        if self.cache is None:
+            return self._score(raw)
+
+        raw = self._check_raw(raw)
+        keys = self.cache.row_keys(raw)
+        proba, missing = self.cache.get_many(keys)
+        if missing.any():
+            proba[missing] = self._score(raw[missing])
+            self.cache.put_many(keys[missing], proba[missing])
+        return proba
+
+    def _score(self, raw: np.ndarray) -> np.ndarray:
+        X = self.build_features(raw)
+        if self.flat is not None:
+            return self.flat.predict_proba(X)
+
+        probas = {
+            model_name: np.mean([score(X) for score in self.scorers[model_name]], axis=0)
+            for model_name in self.weights
+        }
+        return combine_probas(self.spec, probas)
+
+    def predict_one(self, record: dict) -> float:
+        """
+        Probability for one patient record (field name -> value).
+        """
+        return float(self.predict_proba(self.record_to_array(record))[0])
@@ -0,0 +1,102 @@
+# src/registry.py
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import joblib
+from concurrent.futures import ThreadPoolExecutor
+from src.exception import CustomException
+import sys
+
+from .config import MODEL_DIR, MODEL_LOAD_THREADS, MODEL_REGISTRY_VERIFY
+
+logger = logging.getLogger(__name__)
+
+
+# Process-wide cache of unpickled fold models, keyed by file path. Each
+# entry remembers the file's stamp (mtime + size, or a content hash with
+# MODEL_REGISTRY_VERIFY = "hash") and is reloaded once the file changes, so
+# retraining into MODEL_DIR is picked up without restarting. The pickles
+# only wrap each library's native model bytes, and parsing those happens
+# mostly in ctypes / C++ calls that release the GIL, so missing models are
+# loaded on a thread pool.
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def file_stamp(path, verify=MODEL_REGISTRY_VERIFY):
+    if verify == "hash":
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def fold_model_paths(model_name, model_dir=MODEL_DIR):
+    path = model_dir / model_name
+    files = sorted(f for f in os.listdir(path) if f.endswith(".pkl")) if os.path.isdir(path) else []
+    if not files:
+        raise CustomException(f"No saved models found for {model_name}", sys)
+    return [path / f for f in files]
+
+
+def load_models(model_names, model_dir=MODEL_DIR, threads=MODEL_LOAD_THREADS):
+    """
+    {model_name: [fold models]} for several model types. Cached models whose
+    file is unchanged are reused; the rest are loaded on one thread pool.
+    """
+    paths = {name: fold_model_paths(name, model_dir) for name in model_names}
+    stamps = {p: file_stamp(p) for folds in paths.values() for p in folds}
+
+    with _LOCK:
+        stale = [p for p, stamp in stamps.items() if p not in _CACHE or _CACHE[p][0] != stamp]
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=max(1, min(threads, len(stale)))) as pool:
+            loaded = list(pool.map(joblib.load, stale))
+        with _LOCK:
+            for p, model in zip(stale, loaded):
+                _CACHE[p] = (stamps[p], model)
+        logger.info(f"Loaded {len(stale)} fold models ({len(stamps) - len(stale)} cached)")
+
+    with _LOCK:
+        return {name: [_CACHE[p][1] for p in folds] for name, folds in paths.items()}
+
+
+def load_fold_models(model_name, model_dir=MODEL_DIR):
+    return load_models([model_name], model_dir)[model_name]
+
+
+def clear_registry(model_dir=None):
+    """
+    Drops every cached model, or only those under model_dir.
+    """
+    with _LOCK:
+        for p in list(_CACHE):
+            if model_dir is None or str(p).startswith(str(model_dir)):
+                del _CACHE[p]
+
+
+def model_set_version(model_dir=MODEL_DIR, spec=None, *extra):
+    """
+    Hash of what a probability depends on besides its input row: the size
+    and mtime of every fold pickle the ensemble spec uses, the spec itself,
+    the feature code and any `extra` (e.g. a compiled ensemble's metadata).
+    """
+    from .blend import load_ensemble_spec
+    from .feature_cache import feature_code_version
+    from .flat_trees import model_sources
+
+    spec = spec or load_ensemble_spec()
+    h = hashlib.blake2b(digest_size=12)
+    h.update(json.dumps(
+        [model_sources(model_dir, spec["weights"]), spec, feature_code_version(), *extra],
+        sort_keys=True, default=str,
+    ).encode())
+    return h.hexdigest()
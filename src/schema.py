@@ -0,0 +1,134 @@
+# src/schema.py
+
+import logging
+import numpy as np
+import pandas as pd
+from src.exception import CustomException
+import sys
+
+from .config import TARGET_COL, RAW_CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+
+# Storage dtype and allowed (min, max) of every known raw column.
+# Continuous measurements are float32 where that is lossless (e.g. integer
+# readings below 2**24); a column holding values float32 would round, such as
+# one-decimal readings, stays float64, so features are computed from exactly
+# the CSV values. Flags and the target are int8 0/1. Bounds of None only
+# check that the value fits the dtype.
+RAW_SCHEMA = {
+    "id": ("int32", None, None),
+    "age": ("float32", None, None),
+    "gender": ("int8", 0, 1),
+    "bmi": ("float32", None, None),
+    "waist_to_hip_ratio": ("float32", None, None),
+    "systolic_bp": ("float32", None, None),
+    "diastolic_bp": ("float32", None, None),
+    "heart_rate": ("float32", None, None),
+    "cholesterol": ("float32", None, None),
+    "ldl": ("float32", None, None),
+    "hdl": ("float32", None, None),
+    "triglycerides": ("float32", None, None),
+    "physical_activity": ("float32", None, None),
+    "screen_time": ("float32", None, None),
+    "sleep_duration": ("float32", None, None),
+    "hypertension_history": ("int8", 0, 1),
+    "cardiovascular_history": ("int8", 0, 1),
+    "family_history": ("int8", 0, 1),
+    TARGET_COL: ("int8", 0, 1),
+}
+
+
+def schema_dtype(col, default=np.float64):
+    """
+    Storage dtype of a raw column (default for columns outside the schema).
+    """
+    return np.dtype(RAW_SCHEMA[col][0]) if col in RAW_SCHEMA else np.dtype(default)
+
+
+def cast_column(col, values, source=""):
+    """
+    Casts one column to its schema dtype, raising CustomException when a
+    value would overflow, lose its integer value or fall outside the bounds.
+    Floats that the narrower float dtype would round are kept as they are.
+    """
+    dtype, lo, hi = RAW_SCHEMA[col]
+    dtype = np.dtype(dtype)
+    values = np.asarray(values)
+    where = f" in {source}" if source else ""
+
+    if values.dtype.kind not in "biuf":
+        raise CustomException(f"Column '{col}'{where} is not numeric ({values.dtype})", sys)
+
+    if dtype.kind == "f":
+        low, high = -np.finfo(dtype).max, np.finfo(dtype).max
+    else:
+        low, high = np.iinfo(dtype).min, np.iinfo(dtype).max
+        if values.dtype.kind == "f":
+            bad = ~np.isfinite(values) | (values != np.round(values))
+            if bad.any():
+                raise CustomException(
+                    f"Column '{col}'{where}: {int(bad.sum())} missing or non-integer value(s) for {dtype}", sys
+                )
+    if lo is not None:
+        low = max(low, lo)
+    if hi is not None:
+        high = min(high, hi)
+
+    # NaN compares False, so missing floats pass through to the float column
+    with np.errstate(invalid="ignore"):
+        bad = (values < low) | (values > high)
+    if bad.any():
+        raise CustomException(
+            f"Column '{col}'{where}: {int(bad.sum())} value(s) outside [{low}, {high}] for {dtype} "
+            f"(min {np.nanmin(values)}, max {np.nanmax(values)})", sys
+        )
+
+    narrow = values.astype(dtype, copy=False)
+    if dtype.kind == "f" and values.dtype.itemsize > dtype.itemsize:
+        if not np.array_equal(narrow, values, equal_nan=True):
+            return values
+    return narrow
+
+
+def apply_schema(df: pd.DataFrame, source="") -> pd.DataFrame:
+    """
+    Returns df with every schema column cast to its dtype (others untouched).
+    """
+    typed = {
+        col: cast_column(col, df[col].to_numpy(), source)
+        for col in df.columns
+        if col in RAW_SCHEMA and df[col].dtype != schema_dtype(col)
+    }
+    typed = {col: v for col, v in typed.items() if v.dtype != df[col].dtype}
+    if not typed:
+        return df
+    return df.assign(**{col: pd.Series(v, index=df.index, copy=False) for col, v in typed.items()})
+
+
+def read_typed_csv(path, chunk_rows=RAW_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Reads a raw CSV in chunks, checking and downcasting each chunk to
+    RAW_SCHEMA, so the wide default dtypes never exist for the whole file.
+    """
+    chunks = []
+    wide_bytes = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        wide_bytes += chunk.memory_usage(deep=True).sum()
+        chunks.append(apply_schema(chunk, source=str(path)))
+
+    if not chunks:  # header only
+        return apply_schema(pd.read_csv(path), source=str(path))
+
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    unknown = [c for c in df.columns if c not in RAW_SCHEMA]
+    if unknown:
+        logger.warning(f"{path}: columns outside RAW_SCHEMA kept with default dtypes: {unknown}")
+
+    typed_bytes = df.memory_usage(deep=True).sum()
+    logger.info(
+        f"Loaded {path} ({len(df)} rows): {typed_bytes / 2**20:.1f} MiB typed "
+        f"vs {wide_bytes / 2**20:.1f} MiB with default dtypes"
+    )
+    return df
@@ -0,0 +1,218 @@
+# src/storage.py
+
+import os
+import json
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.exception import CustomException
+import sys
+
+from .config import PROCESSED_FORMAT
+from .schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = "schema.json"
+SCHEMA_VERSION = 1
+
+
+def store_path(csv_path: Path, fmt: str = PROCESSED_FORMAT) -> Path:
+    """
+    Binary counterpart of a processed CSV path:
+    train.csv -> train.npy/ (column store) or train.feather.
+    """
+    csv_path = Path(csv_path)
+    if fmt == "npy":
+        return csv_path.with_suffix(".npy")
+    if fmt == "feather":
+        return csv_path.with_suffix(".feather")
+    return csv_path
+
+
+def save_npy_store(df: pd.DataFrame, path: Path):
+    """
+    Writes one .npy file per column plus a schema.json with names and dtypes.
+    Numeric columns can be memory-mapped; other columns are pickled arrays.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col].to_numpy()
+        kind = "numeric" if values.dtype.kind in "biuf" else "object"
+
+        file_name = f"{i:04d}.npy"
+        np.save(tmp_path / file_name, np.ascontiguousarray(values), allow_pickle=kind == "object")
+        columns.append({
+            "name": col,
+            "file": file_name,
+            "dtype": str(df[col].dtype),
+            "kind": kind,
+        })
+
+    schema = {"version": SCHEMA_VERSION, "n_rows": len(df), "columns": columns}
+    with open(tmp_path / SCHEMA_FILE, "w") as f:
+        json.dump(schema, f, indent=2)
+
+    # Swap in the finished store so readers never see a partial one
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def load_npy_store(path: Path, mmap: bool = True) -> pd.DataFrame:
+    """
+    Opens a column store. Numeric columns are memory-mapped read-only and
+    wrapped without copying; other columns are loaded into memory.
+    """
+    with open(path / SCHEMA_FILE) as f:
+        schema = json.load(f)
+
+    if schema.get("version") != SCHEMA_VERSION:
+        raise CustomException(f"Unsupported column store version in {path}", sys)
+
+    data = {}
+    for col in schema["columns"]:
+        if col["kind"] == "numeric":
+            # plain ndarray view over the map; the mapping stays referenced
+            data[col["name"]] = np.asarray(np.load(path / col["file"], mmap_mode="r" if mmap else None))
+        else:
+            values = np.load(path / col["file"], allow_pickle=True)
+            data[col["name"]] = pd.Series(values, copy=False).astype(col["dtype"])
+
+    return pd.DataFrame(data, copy=False)
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _read_feather(path: Path) -> pd.DataFrame:
+    from pyarrow import feather
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+def _iter_feather(path: Path, chunk_size: int):
+    """
+    Yields chunk_size-row frames of a feather file, decoding its record
+    batches one at a time, so only about one chunk is held as pandas.
+    """
+    import pyarrow as pa
+
+    def to_frame(table, start):
+        return table.to_pandas().set_axis(pd.RangeIndex(start, start + table.num_rows))
+
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        pending = None
+        start = 0
+        for i in range(reader.num_record_batches):
+            batch = pa.Table.from_batches([reader.get_batch(i)])
+            pending = batch if pending is None else pa.concat_tables([pending, batch])
+            while pending.num_rows >= chunk_size:
+                yield to_frame(pending.slice(0, chunk_size), start)
+                start += chunk_size
+                pending = pending.slice(chunk_size)
+        if pending is not None and pending.num_rows:
+            yield to_frame(pending, start)
+
+
+def _resolve_format(fmt):
+    if fmt == "feather" and not _has_pyarrow():
+        logger.warning("pyarrow is not installed, using the npy column store instead of feather")
+        return "npy"
+    if fmt not in ("npy", "feather", "csv"):
+        raise CustomException(f"Unknown processed data format: {fmt}", sys)
+    return fmt
+
+
+def save_processed_frame(df: pd.DataFrame, csv_path: Path, fmt: str = PROCESSED_FORMAT) -> Path:
+    """
+    Saves a processed frame in the configured format and returns its path.
+    """
+    fmt = _resolve_format(fmt)
+    path = store_path(csv_path, fmt)
+
+    if fmt == "npy":
+        save_npy_store(df, path)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+
+    return path
+
+
+def _is_fresh(path: Path, csv_path: Path) -> bool:
+    """
+    A binary copy is used unless the CSV next to it was written later.
+    """
+    if not path.exists():
+        return False
+    if not csv_path.exists():
+        return True
+    return path.stat().st_mtime >= csv_path.stat().st_mtime
+
+
+def find_processed_store(csv_path: Path, fmt: str = PROCESSED_FORMAT):
+    """
+    Returns (format, path) of the best copy of a processed file on disk.
+    """
+    csv_path = Path(csv_path)
+    if fmt != "csv":
+        for candidate in dict.fromkeys((fmt, "npy", "feather")):
+            if candidate == "feather" and not _has_pyarrow():
+                continue
+            path = store_path(csv_path, candidate)
+            if _is_fresh(path, csv_path):
+                return candidate, path
+
+    if not csv_path.exists():
+        raise CustomException(f"Missing file: {csv_path}", sys)
+    return "csv", csv_path
+
+
+def load_processed_frame(csv_path: Path, fmt: str = PROCESSED_FORMAT) -> pd.DataFrame:
+    """
+    Loads a processed file, preferring the memory-mapped / binary copy.
+    """
+    fmt, path = find_processed_store(csv_path, fmt)
+    logger.info(f"Loading {path} ({fmt})")
+
+    if fmt == "npy":
+        return load_npy_store(path)
+    if fmt == "feather":
+        return _read_feather(path)
+    # CSV loses the typed schema; re-apply it
+    return apply_schema(pd.read_csv(path), source=str(path))
+
+
+def iter_processed_chunks(csv_path: Path, chunk_size: int, fmt: str = PROCESSED_FORMAT):
+    """
+    Yields consecutive row chunks of a processed file. Column stores are
+    sliced from the memory map and feather files decoded batch by batch,
+    so only the current chunk is paged in.
+    """
+    fmt, path = find_processed_store(csv_path, fmt)
+    logger.info(f"Streaming {path} ({fmt})")
+
+    if fmt == "csv":
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            yield apply_schema(chunk, source=str(path))
+        return
+
+    if fmt == "feather":
+        yield from _iter_feather(path, chunk_size)
+        return
+
+    df = load_npy_store(path)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
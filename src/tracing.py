@@ -0,0 +1,235 @@
+# src/tracing.py
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import threading
+import cProfile
+from datetime import datetime
+from contextlib import contextmanager
+
+from .config import LOG_DIR, TRACE_SAMPLE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Trace of the running pipeline, set by start_trace
+_ACTIVE = {}
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes (None where /proc is missing).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Trace:
+    """
+    Collects nested timing spans for one run.
+
+    Each span records wall and CPU seconds plus RSS at entry, exit and the
+    highest value seen by a background sampler while it was open. Spans
+    whose name is in `profile` (or every top-level span with "all") are also
+    run under cProfile, with the stats dumped next to the trace file.
+    """
+
+    def __init__(self, name, profile=(), sample_interval=TRACE_SAMPLE_INTERVAL, log_dir=LOG_DIR):
+        self.name = name
+        self.run_id = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
+        self.profile = set(profile or ())
+        self.sample_interval = sample_interval
+        self.log_dir = log_dir
+        self.spans = []
+
+        self._t0 = time.time()
+        self._clock0 = time.perf_counter()
+        self._local = threading.local()
+        self._open = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._profiling = False
+
+    def start(self):
+        if self.sample_interval and current_rss() is not None:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            rss = current_rss()
+            with self._lock:
+                for record in self._open:
+                    record["rss_peak"] = max(record["rss_peak"], rss)
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._stack()
+        path = "/".join([s["path"] for s in stack[-1:]] + [name])
+        rss = current_rss()
+        record = {
+            "path": path,
+            "pid": os.getpid(),
+            "start": round(time.perf_counter() - self._clock0, 6),
+            **attrs,
+            "rss_start": rss,
+            "rss_peak": rss or 0,
+        }
+
+        profiler = None
+        if not self._profiling and (name in self.profile or ("all" in self.profile and not stack)):
+            profiler = cProfile.Profile()
+            self._profiling = True
+
+        with self._lock:
+            self._open.append(record)
+        stack.append(record)
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                record["profile"] = self._dump_profile(profiler, path)
+
+            record["duration"] = round(time.perf_counter() - wall0, 6)
+            record["cpu"] = round(time.process_time() - cpu0, 6)
+            record["rss_end"] = current_rss()
+            stack.pop()
+            with self._lock:
+                self._open.remove(record)
+                if record["rss_end"] is not None:
+                    record["rss_peak"] = max(record["rss_peak"], record["rss_end"])
+                if stack:
+                    stack[-1]["rss_peak"] = max(stack[-1]["rss_peak"], record["rss_peak"])
+                self.spans.append(record)
+
+    def _dump_profile(self, profiler, path):
+        out = os.path.join(self.log_dir, f"profile_{self.run_id}_{path.replace('/', '.')}.prof")
+        profiler.dump_stats(out)
+        return out
+
+    def merge(self, spans, parent=None):
+        """
+        Adds spans recorded by another process (see collect_spans).
+        Their start times are shifted onto this trace's clock.
+        """
+        prefix = parent or "/".join(s["path"] for s in self._stack()[-1:])
+        with self._lock:
+            for record in spans:
+                record = dict(record)
+                t0 = record.pop("t0")
+                record["start"] = round(t0 + record["start"] - self._t0, 6)
+                if prefix:
+                    record["path"] = f"{prefix}/{record['path']}"
+                self.spans.append(record)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "run_id": self.run_id,
+            "argv": sys.argv,
+            "started": datetime.fromtimestamp(self._t0).isoformat(timespec="seconds"),
+            "duration": round(time.perf_counter() - self._clock0, 6),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "peak_rss": peak_rss(),
+            "spans": sorted(self.spans, key=lambda s: s["start"]),
+        }
+
+    def save(self, path=None):
+        path = path or os.path.join(self.log_dir, f"trace_{self.run_id}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Trace saved -> {path}")
+        return path
+
+
+@contextmanager
+def start_trace(name, profile=(), save=True, **kwargs):
+    """
+    Makes a new Trace the active one for the duration of the block and
+    writes it to LOG_DIR/trace_<timestamp>.json on exit.
+    """
+    trace = Trace(name, profile=profile, **kwargs).start()
+    previous = _ACTIVE.get("trace")
+    _ACTIVE["trace"] = trace
+    try:
+        yield trace
+    finally:
+        trace.stop()
+        _ACTIVE["trace"] = previous
+        if save:
+            trace.save()
+
+
+def active_trace():
+    return _ACTIVE.get("trace")
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times the block as a span of the active trace. Without an active trace
+    it yields a throwaway record, so instrumented code runs unchanged.
+    """
+    trace = _ACTIVE.get("trace")
+    if trace is None:
+        yield dict(attrs)
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+
+
+@contextmanager
+def collect_spans():
+    """
+    Records spans inside a worker process (no sampler, nothing written) and
+    yields the list to send back for Trace.merge in the parent.
+    """
+    spans = []
+    with start_trace("worker", save=False, sample_interval=None) as trace:
+        yield spans
+    for record in trace.spans:
+        spans.append(dict(record, t0=trace._t0))
@@ -1,8 +1,11 @@
 import os
 import joblib
 import logging
+import multiprocessing
 import numpy as np
 import pandas as pd
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from sklearn.model_selection import StratifiedKFold
 from sklearn.metrics import roc_auc_score
@@ -14,71 +17,259 @@ from .config import (
     SEED,
     SHUFFLE,
     TARGET_COL,
+    TRAIN_CPU_BUDGET,
+    TRAIN_THREADS_PER_FIT,
+    TRAIN_MAX_WORKERS,
+    TRAIN_REUSE_BINS,
+    TRAIN_RESUME,
 )
-from .features import build_train_matrix
-from .models import get_all_models
+from .feature_cache import load_train_matrix
+from .models import get_all_models, get_model, early_stopping_fit_params, best_iteration, positive_proba
+from .binned import build_binned, fit_binned
+from .evaluate import evaluate_oof, print_eval_results
+from .blend import save_oof
+from .manifest import data_fingerprint, fold_params_hash, load_manifest, completed_fold, record_fold
+from .tracing import span, collect_spans, active_trace
 
 logger = logging.getLogger(__name__)
 
+# Feature matrix of a pool worker, set once by _init_worker
+_WORKER_DATA = {}
 
-def save_fold_model(model_name, fold, model):
-    path = MODEL_DIR / model_name
+
+def save_fold_model(model_name, fold, model, model_dir=MODEL_DIR):
+    path = model_dir / model_name
     os.makedirs(path, exist_ok=True)
 
     model_path = path / f"{model_name}_fold{fold}.pkl"
     joblib.dump(model, model_path)
 
 
-def cross_validate_model(model_name, model, X, y):
+def get_cv_splits(X, y):
     skf = StratifiedKFold(
         n_splits=CV_FOLDS,
         shuffle=SHUFFLE,
         random_state=SEED
     )
+    return list(skf.split(X, y))
+
+
+def fit_fold(model_name, fold, model, X, y, train_idx, val_idx, model_dir=MODEL_DIR, binned=None):
+    """
+    Fits one CV fold, saves the fold model and returns (val_pred, fold_score).
+    With `binned` (see build_binned) the fold trains on a row subset of the
+    pre-quantized matrix instead of a copied X.iloc slice. Either way the
+    validation rows drive early stopping, and the saved model keeps its best
+    iteration for inference.
+    """
+    X_val, y_val = X.iloc[val_idx], y.iloc[val_idx]
+
+    with span("fit", rows=len(train_idx), binned=binned is not None) as s:
+        if binned is None:
+            fit_params = early_stopping_fit_params(model_name, model, X_val, y_val)
+            model.fit(X.iloc[train_idx], y.iloc[train_idx], **fit_params)
+        else:
+            model = fit_binned(model_name, model, binned, train_idx, val_idx)
+        s["best_iteration"] = best_iteration(model)
+    logger.info(f"{model_name.upper()} | Fold {fold} best iteration: {s['best_iteration']}")
+
+    with span("predict_val", rows=len(val_idx)):
+        val_pred = positive_proba(model, X_val)
+        fold_score = roc_auc_score(y_val, val_pred)
+
+    with span("save_model"):
+        save_fold_model(model_name, fold, model, model_dir)
+
+    return val_pred, fold_score
+
+
+def log_cv_summary(model_name, scores):
+    logger.info(f"\n{model_name.upper()} CV Mean ROC-AUC: {np.mean(scores):.5f}")
+    logger.info(f"{model_name.upper()} CV Std: {np.std(scores):.5f}")
+
+
+def prepare_binned(model_name, model, X, y, reuse_bins=TRAIN_REUSE_BINS):
+    """
+    The binned matrix shared by model_name's folds (None when disabled).
+    """
+    if not reuse_bins:
+        return None
+    with span(f"{model_name}/build_binned", rows=len(X)):
+        return build_binned(model_name, model, X, y)
 
+
+def cross_validate_model(model_name, model, X, y, reuse_bins=TRAIN_REUSE_BINS, data_key=None, model_dir=MODEL_DIR):
+    """
+    Fits model_name's CV folds one after another. With `data_key` (see
+    data_fingerprint) finished folds are recorded in the run manifest, and
+    folds it already holds for the same data and parameters are read back.
+    """
     oof_preds = np.zeros(len(X))
     scores = []
+    binned = None
+    # hashed before any fit: early stopping adds fit-time parameters to the model
+    param_key = fold_params_hash(model_name, model, reuse_bins)
+    manifest = load_manifest(model_dir) if data_key else {}
 
-    for fold, (train_idx, val_idx) in enumerate(skf.split(X, y), 1):
+    for fold, (train_idx, val_idx) in enumerate(get_cv_splits(X, y), 1):
         logger.info(f"\n===== {model_name.upper()} | FOLD {fold} =====")
 
-        X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-        y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-
-        model.fit(X_train, y_train)
-
-        val_pred = model.predict_proba(X_val)[:, 1]
+        done = completed_fold(manifest, model_name, fold, data_key, param_key, len(val_idx), model_dir)
+        if done is not None:
+            val_pred, fold_score = done
+            logger.info(f"Fold {fold} unchanged since the last run; reusing its saved model")
+        else:
+            if binned is None:
+                binned = prepare_binned(model_name, model, X, y, reuse_bins)
+            with span(f"{model_name}/fold{fold}") as s:
+                val_pred, fold_score = fit_fold(model_name, fold, model, X, y, train_idx, val_idx, model_dir, binned)
+                s["auc"] = fold_score
+            if data_key:
+                record_fold(model_name, fold, data_key, param_key, val_pred, fold_score, model_dir)
         oof_preds[val_idx] = val_pred
-
-        fold_score = roc_auc_score(y_val, val_pred)
         scores.append(fold_score)
 
         logger.info(f"Fold {fold} ROC-AUC: {fold_score:.5f}")
 
-        save_fold_model(model_name, fold, model)
-
-    logger.info(f"\n{model_name.upper()} CV Mean ROC-AUC: {np.mean(scores):.5f}")
-    logger.info(f"{model_name.upper()} CV Std: {np.std(scores):.5f}")
+    log_cv_summary(model_name, scores)
 
     return oof_preds, scores
 
 
-def run_training():
-    logger.info("Loading processed training data...")
-    df = pd.read_csv(TRAIN_FILE)
+def plan_cpu_budget(n_jobs, cpu_budget=TRAIN_CPU_BUDGET, threads_per_fit=TRAIN_THREADS_PER_FIT,
+                    max_workers=TRAIN_MAX_WORKERS):
+    """
+    Splits the CPU budget into (concurrent workers, library threads per fit).
+    """
+    workers = max(1, cpu_budget // threads_per_fit)
+    if max_workers:
+        workers = min(workers, max_workers)
+    return min(workers, n_jobs), threads_per_fit
 
-    logger.info("Building training matrix with features...")
-    X, y, features = build_train_matrix(df)
 
-    models = get_all_models()
+def _init_worker(X, y):
+    _WORKER_DATA["X"] = X
+    _WORKER_DATA["y"] = y
+
+
+def _run_fold_job(model_name, fold, train_idx, val_idx, n_threads, reuse_bins, model_dir=MODEL_DIR):
+    X, y = _WORKER_DATA["X"], _WORKER_DATA["y"]
+    model = get_model(model_name, n_threads)
+    with collect_spans() as spans:
+        # each worker bins X once per model type and keeps it for later folds
+        if reuse_bins and ("binned", model_name) not in _WORKER_DATA:
+            _WORKER_DATA["binned", model_name] = prepare_binned(model_name, model, X, y, reuse_bins)
+        binned = _WORKER_DATA.get(("binned", model_name))
+
+        with span(f"{model_name}/fold{fold}") as s:
+            val_pred, fold_score = fit_fold(model_name, fold, model, X, y, train_idx, val_idx, model_dir, binned)
+            s["auc"] = fold_score
+    return model_name, fold, val_pred, fold_score, spans
+
+
+def cross_validate_parallel(model_names, X, y, workers, n_threads, reuse_bins=TRAIN_REUSE_BINS, data_key=None,
+                            model_dir=MODEL_DIR):
+    """
+    Runs every (model, fold) fit in a process pool of `workers` processes.
+    Each fit starts from a fresh model with the same seed, splits and thread
+    count as the sequential path, so OOF predictions, scores and saved fold
+    models are identical to cross_validate_model. With `data_key` the run
+    manifest is used the same way: recorded folds are skipped and fits are
+    recorded as they finish.
+    """
+    splits = get_cv_splits(X, y)
+
+    all_oof = {name: np.zeros(len(X)) for name in model_names}
+    fold_scores = {name: {} for name in model_names}
+
+    manifest = load_manifest(model_dir) if data_key else {}
+    param_keys = {name: fold_params_hash(name, get_model(name, n_threads), reuse_bins) for name in model_names}
+    jobs = []
+    for name in model_names:
+        for fold, (train_idx, val_idx) in enumerate(splits, 1):
+            done = completed_fold(manifest, name, fold, data_key, param_keys[name], len(val_idx), model_dir)
+            if done is None:
+                jobs.append((name, fold, train_idx, val_idx))
+            else:
+                all_oof[name][val_idx], fold_scores[name][fold] = done
+    if len(jobs) < len(model_names) * len(splits):
+        logger.info(f"Reusing {len(model_names) * len(splits) - len(jobs)} unchanged folds; {len(jobs)} to fit")
+
+    # spawn: forking after the GBDT libraries load OpenMP can deadlock
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(workers, len(jobs))),
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(X, y),
+    ) if jobs else nullcontext() as pool:
+        futures = [
+            pool.submit(_run_fold_job, name, fold, train_idx, val_idx, n_threads, reuse_bins, model_dir)
+            for name, fold, train_idx, val_idx in jobs
+        ]
+
+        for future in as_completed(futures):
+            model_name, fold, val_pred, fold_score, spans = future.result()
+            if active_trace() is not None:
+                active_trace().merge(spans)
+            val_idx = splits[fold - 1][1]
+            all_oof[model_name][val_idx] = val_pred
+            fold_scores[model_name][fold] = fold_score
+            if data_key:
+                record_fold(model_name, fold, data_key, param_keys[model_name], val_pred, fold_score, model_dir)
+
+            logger.info(f"{model_name.upper()} | Fold {fold} ROC-AUC: {fold_score:.5f}")
+
+    all_scores = {}
+    for name in model_names:
+        all_scores[name] = [fold_scores[name][fold] for fold in sorted(fold_scores[name])]
+        log_cv_summary(name, all_scores[name])
+
+    return all_oof, all_scores
+
+
+def report_oof(all_oof, y):
+    """
+    Scores each model's OOF predictions and their ensemble (combined with
+    the current ensemble spec) in one pass per prediction vector, logs the
+    results and saves the OOF matrix for the weight search.
+    """
+    with span("evaluate_oof", rows=len(y)):
+        results = evaluate_oof(all_oof, np.asarray(y))
+    for name, res in results.items():
+        print_eval_results(name, res)
+    save_oof(all_oof, y)
+    return results
+
+
+def run_training(max_workers=TRAIN_MAX_WORKERS, resume=TRAIN_RESUME):
+    logger.info("Loading training matrix with features...")
+    with span("load_train_matrix") as s:
+        X, y, features = load_train_matrix(TRAIN_FILE)
+        s["rows"], s["features"] = X.shape
+
+    # fingerprint of the matrix the folds are fitted on; None turns the run manifest off
+    data_key = None
+    if resume:
+        with span("data_fingerprint"):
+            data_key = data_fingerprint(X, y)
+
+    models = get_all_models(n_threads=TRAIN_THREADS_PER_FIT)
+    workers, n_threads = plan_cpu_budget(len(models) * CV_FOLDS, max_workers=max_workers)
 
     all_oof = {}
     all_scores = {}
 
-    for name, model in models.items():
-        oof_preds, scores = cross_validate_model(name, model, X, y)
-        all_oof[name] = oof_preds
-        all_scores[name] = scores
+    if workers > 1:
+        logger.info(f"Training {len(models) * CV_FOLDS} fits on {workers} workers x {n_threads} threads")
+        all_oof, all_scores = cross_validate_parallel(list(models), X, y, workers, n_threads, data_key=data_key)
+    else:
+        for name, model in models.items():
+            oof_preds, scores = cross_validate_model(name, model, X, y, data_key=data_key)
+            all_oof[name] = oof_preds
+            all_scores[name] = scores
+
+    report_oof(all_oof, y)
 
     logger.info("\nTraining completed successfully.")
     return all_oof, all_scores
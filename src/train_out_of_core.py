@@ -0,0 +1,339 @@
+# src/train_out_of_core.py
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import numpy as np
+from pathlib import Path
+from sklearn.metrics import roc_auc_score
+from src.exception import CustomException
+import sys
+
+from .config import (
+    TRAIN_FILE,
+    MODEL_DIR,
+    MODEL_NAMES,
+    CV_FOLDS,
+    EARLY_STOPPING_ROUNDS,
+    TRAIN_THREADS_PER_FIT,
+    OUT_OF_CORE_DIR,
+    OUT_OF_CORE_CHUNK_ROWS,
+    OUT_OF_CORE_MODELS,
+    OOF_FILE,
+)
+from .features import build_train_matrix
+from .storage import iter_processed_chunks
+from .feature_cache import cache_key
+from .models import get_model, best_iteration
+from .binned import lightgbm_params, xgboost_params, xgboost_classifier
+from .predictor import fold_scorer
+from .train import get_cv_splits, save_fold_model, log_cv_summary, report_oof
+from .blend import load_oof
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Layout of one spill entry (OUT_OF_CORE_DIR/<train cache key>/):
+#   features.bin    row-major feature matrix, appended chunk by chunk
+#   labels.npy      int8 target
+#   meta.json       n_rows, dtype and feature names
+#   train.lgb.bin   LightGBM binned Dataset over every row (folds are subsets)
+# The key changes with the processed train file or the feature code, so a
+# rerun on the same data skips the streaming pass and the binning.
+SPILL_FILE = "features.bin"
+LABEL_FILE = "labels.npy"
+META_FILE = "meta.json"
+LIGHTGBM_BINARY = "train.lgb.bin"
+
+
+def spill_train_matrix(train_file=TRAIN_FILE, chunk_rows=OUT_OF_CORE_CHUNK_ROWS, work_dir=OUT_OF_CORE_DIR):
+    """
+    Streams the processed train file through build_train_matrix chunk by
+    chunk into a spill file, in the matrix's common dtype. Only one chunk
+    and the labels are held in memory. Returns the spill entry directory.
+    """
+    entry = Path(work_dir) / cache_key("train", train_file)
+    if (entry / META_FILE).exists():
+        logger.info(f"Reusing spilled train matrix {entry}")
+        return entry
+
+    # entries of older data or feature code are no longer needed
+    if Path(work_dir).exists():
+        for old in Path(work_dir).iterdir():
+            shutil.rmtree(old, ignore_errors=True)
+
+    tmp = entry.with_name(entry.name + ".tmp")
+    tmp.mkdir(parents=True)
+
+    labels, features, dtype = [], None, None
+    with open(tmp / SPILL_FILE, "wb") as f:
+        for chunk in iter_processed_chunks(train_file, chunk_rows):
+            X, y, chunk_features = build_train_matrix(chunk)
+            if features is None:
+                features = chunk_features
+                dtype = np.result_type(np.float32, *X.dtypes)
+            elif chunk_features != features:
+                raise CustomException("Feature columns differ between train chunks", sys)
+
+            f.write(np.ascontiguousarray(X.to_numpy(dtype=dtype)).tobytes())
+            labels.append(y.to_numpy(dtype=np.int8))
+
+    if features is None:
+        raise CustomException(f"Training file {train_file} has no rows", sys)
+
+    y = np.concatenate(labels)
+    np.save(tmp / LABEL_FILE, y)
+    with open(tmp / META_FILE, "w") as f:
+        json.dump({"n_rows": len(y), "dtype": dtype.str, "features": features}, f, indent=2)
+
+    os.replace(tmp, entry)
+    logger.info(f"Spilled {len(y)} x {len(features)} train matrix -> {entry}")
+    return entry
+
+
+class SpillReader:
+    """
+    Reads rows of a spill entry with plain file reads. Nothing is
+    memory-mapped, so only the rows of the current block are resident.
+    """
+
+    def __init__(self, entry: Path):
+        with open(entry / META_FILE) as f:
+            meta = json.load(f)
+        self.path = entry / SPILL_FILE
+        self.dtype = np.dtype(meta["dtype"])
+        self.features = meta["features"]
+        self.n_rows = meta["n_rows"]
+        self.y = np.load(entry / LABEL_FILE)
+        self._row_bytes = self.dtype.itemsize * len(self.features)
+        self._file = None
+
+    def read(self, start, stop):
+        """
+        Rows [start, stop) as an in-memory array.
+        """
+        start, stop = max(start, 0), min(stop, self.n_rows)
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        data = os.pread(self._file.fileno(), max(stop - start, 0) * self._row_bytes, start * self._row_bytes)
+        return np.frombuffer(data, dtype=self.dtype).reshape(-1, len(self.features))
+
+    def blocks(self, block_rows, mask=None):
+        """
+        Yields (X block, y block) in file order, keeping only rows where
+        `mask` is True.
+        """
+        for start in range(0, self.n_rows, block_rows):
+            X, y = self.read(start, start + block_rows), self.y[start:start + block_rows]
+            if mask is not None:
+                keep = mask[start:start + block_rows]
+                X, y = X[keep], y[keep]
+            if len(y):
+                yield X, y
+
+
+def predict_spill(predict, spill: SpillReader, mask, block_rows=OUT_OF_CORE_CHUNK_ROWS):
+    """
+    `predict` over the rows selected by `mask`, in row order.
+    """
+    return np.concatenate([predict(X) for X, _ in spill.blocks(block_rows, mask)] or [np.empty(0)])
+
+
+# LIGHTGBM
+
+def build_lightgbm_dataset(entry: Path, params, chunk_rows=OUT_OF_CORE_CHUNK_ROWS):
+    """
+    Bins the spilled matrix into a LightGBM Dataset binary (once per entry).
+    Rows are handed over through lightgbm.Sequence, so the float matrix is
+    read a batch at a time.
+    """
+    import lightgbm as lgb
+
+    path = entry / LIGHTGBM_BINARY
+    if path.exists():
+        return path
+
+    spill = SpillReader(entry)
+
+    class SpillSequence(lgb.Sequence):
+        batch_size = chunk_rows
+
+        def __getitem__(self, idx):
+            if isinstance(idx, slice):
+                start, stop, _ = idx.indices(spill.n_rows)
+                rows = spill.read(start, stop)
+            else:
+                rows = spill.read(idx, idx + 1)[0]
+            return rows.astype(np.float64)  # Sequence rows must be double
+
+        def __len__(self):
+            return spill.n_rows
+
+    dataset = lgb.Dataset(SpillSequence(), label=spill.y, feature_name=spill.features, params=params)
+    dataset.construct()
+
+    tmp = path.with_name(path.name + ".tmp")
+    dataset.save_binary(str(tmp))
+    os.replace(tmp, path)
+    return path
+
+
+def train_lightgbm_fold(entry, train_mask, val_mask, params, n_estimators, chunk_rows=OUT_OF_CORE_CHUNK_ROWS):
+    """
+    Trains one fold on a row subset of the binned Dataset binary, stopping
+    early on the AUC of the validation subset.
+    """
+    import lightgbm as lgb
+
+    full = lgb.Dataset(str(entry / LIGHTGBM_BINARY), params=params)
+    kwargs = {}
+    if EARLY_STOPPING_ROUNDS:
+        params = dict(params, metric="auc")
+        kwargs = {
+            "valid_sets": [full.subset(np.flatnonzero(val_mask))],
+            "callbacks": [lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)],
+        }
+    return lgb.train(params, full.subset(np.flatnonzero(train_mask)), num_boost_round=n_estimators, **kwargs)
+
+
+# XGBOOST
+
+def train_xgboost_fold(entry, train_mask, val_mask, params, n_estimators, chunk_rows=OUT_OF_CORE_CHUNK_ROWS):
+    """
+    Trains one fold from an external-memory quantile DMatrix over the
+    fold's training rows, stopping early on the AUC of its validation rows.
+    The matrices' pages live in a temporary cache directory.
+    """
+    import xgboost as xgb
+
+    spill = SpillReader(entry)
+
+    with tempfile.TemporaryDirectory(dir=entry) as cache_dir:
+
+        class FoldIter(xgb.DataIter):
+            def __init__(self, mask, name):
+                self._mask = mask
+                self._blocks = None
+                super().__init__(cache_prefix=os.path.join(cache_dir, name))
+
+            def next(self, input_data):
+                if self._blocks is None:
+                    self._blocks = spill.blocks(chunk_rows, self._mask)
+                block = next(self._blocks, None)
+                if block is None:
+                    return False
+                input_data(data=block[0], label=block[1], feature_names=spill.features)
+                return True
+
+            def reset(self):
+                self._blocks = None
+
+        dtrain = xgb.ExtMemQuantileDMatrix(FoldIter(train_mask, "train"), max_bin=params["max_bin"])
+        kwargs = {}
+        if EARLY_STOPPING_ROUNDS:
+            dval = xgb.ExtMemQuantileDMatrix(FoldIter(val_mask, "val"), ref=dtrain, max_bin=params["max_bin"])
+            params = dict(params, eval_metric="auc")
+            kwargs = {"evals": [(dval, "validation_0")], "early_stopping_rounds": EARLY_STOPPING_ROUNDS,
+                      "verbose_eval": False}
+        booster = xgb.train(params, dtrain, num_boost_round=n_estimators, **kwargs)
+        model = xgboost_classifier(booster, params)
+        del booster, dtrain, kwargs  # the booster keeps its matrices alive
+
+    return model
+
+
+TRAINERS = {
+    MODEL_NAMES["lgbm"]: (lightgbm_params, train_lightgbm_fold),
+    MODEL_NAMES["xgb"]: (xgboost_params, train_xgboost_fold),
+}
+
+
+def merge_previous_oof(all_oof, y, oof_file=OOF_FILE):
+    """
+    Adds the OOF predictions of models this run did not train (CatBoost) from
+    the last saved OOF file when it holds the same labels, so --blend and the
+    ensemble still see every model whose fold pickles are in MODEL_DIR.
+    """
+    if not oof_file.exists():
+        return all_oof
+    old_oof, old_y = load_oof(oof_file)
+    others = [name for name in old_oof if name not in all_oof]
+    if not others:
+        return all_oof
+    if not np.array_equal(old_y, np.asarray(y, dtype=np.int8)):
+        logger.warning(
+            f"{oof_file} was saved for other training data; dropping the OOF predictions of {others}. "
+            f"Their fold models in MODEL_DIR are stale: retrain them with --train before --blend / --ensemble"
+        )
+        return all_oof
+    logger.info(f"Keeping the OOF predictions of {others} from {oof_file}")
+    return {**all_oof, **{name: old_oof[name] for name in others}}
+
+
+def run_training_out_of_core(model_names=OUT_OF_CORE_MODELS, train_file=TRAIN_FILE,
+                             chunk_rows=OUT_OF_CORE_CHUNK_ROWS, model_dir=MODEL_DIR,
+                             work_dir=OUT_OF_CORE_DIR):
+    """
+    Cross-validates LightGBM / XGBoost without loading the train set into
+    memory. Folds are the StratifiedKFold splits of run_training; fold
+    models are saved to the same pkl paths.
+    """
+    unsupported = [name for name in model_names if name not in TRAINERS]
+    if unsupported:
+        raise CustomException(f"No out-of-core trainer for {unsupported}; use run_training", sys)
+
+    with span("spill_train_matrix"):
+        entry = spill_train_matrix(train_file, chunk_rows, work_dir)
+    spill = SpillReader(entry)
+    y = spill.y
+
+    # StratifiedKFold only looks at the number of rows and the labels;
+    # one fold number per row replaces the index lists
+    fold_of = np.empty(len(y), dtype=np.int8)
+    for fold, (_, val_idx) in enumerate(get_cv_splits(np.zeros(len(y)), y), 1):
+        fold_of[val_idx] = fold
+
+    all_oof = {}
+    all_scores = {}
+
+    for name in model_names:
+        get_params, train_fold = TRAINERS[name]
+        params, n_estimators = get_params(get_model(name, TRAIN_THREADS_PER_FIT))
+
+        if name == MODEL_NAMES["lgbm"]:
+            with span(f"{name}/build_dataset"):
+                build_lightgbm_dataset(entry, params, chunk_rows)
+
+        oof_preds = np.zeros(len(y))
+        scores = []
+        for fold in range(1, CV_FOLDS + 1):
+            logger.info(f"\n===== {name.upper()} | FOLD {fold} (out-of-core) =====")
+            val_mask = fold_of == fold
+
+            with span(f"{name}/fold{fold}") as s:
+                with span("fit", rows=int((~val_mask).sum())) as f:
+                    model = train_fold(entry, ~val_mask, val_mask, params, n_estimators, chunk_rows)
+                    f["best_iteration"] = best_iteration(model)
+
+                with span("predict_val", rows=int(val_mask.sum())):
+                    val_pred = predict_spill(fold_scorer(model), spill, val_mask, chunk_rows)
+                    fold_score = roc_auc_score(y[val_mask], val_pred)
+
+                with span("save_model"):
+                    save_fold_model(name, fold, model, model_dir)
+                s["auc"] = fold_score
+
+            oof_preds[val_mask] = val_pred
+            scores.append(fold_score)
+            logger.info(f"Fold {fold} ROC-AUC: {fold_score:.5f} (best iteration {f['best_iteration']})")
+
+        log_cv_summary(name, scores)
+        all_oof[name] = oof_preds
+        all_scores[name] = scores
+
+    report_oof(merge_previous_oof(all_oof, y), y)
+
+    logger.info("\nOut-of-core training completed successfully.")
+    return all_oof, all_scores
@@ -0,0 +1,234 @@
+# src/tuning.py
+
+import os
+import json
+import time
+import logging
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from sklearn.metrics import roc_auc_score
+from src.exception import CustomException
+import sys
+
+from .config import (
+    TRAIN_FILE,
+    TUNING_DIR,
+    TUNED_PARAMS_FILE,
+    TUNING_TRIALS,
+    TUNING_ETA,
+    TUNING_RUNGS,
+    TUNING_CPU_BUDGET_S,
+    SEARCH_SPACES,
+    CV_FOLDS,
+    SHUFFLE,
+    SEED,
+    TRAIN_REUSE_BINS,
+)
+from .feature_cache import load_train_matrix, cache_key
+from .models import get_model, early_stopping_fit_params, best_iteration, positive_proba
+from .binned import fit_binned
+from .manifest import fold_params_hash
+from .train import get_cv_splits, plan_cpu_budget, prepare_binned
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+_WORKER_DATA = {}
+
+
+# Successive halving with CV folds as the budget: every trial is scored on
+# the first TUNING_RUNGS[0] folds, the best 1/TUNING_ETA move on to
+# TUNING_RUNGS[1] folds, and so on; early stopping prunes rounds inside each
+# fold. Fold fits of all live trials run in one process pool and train the
+# way --train does: on the shared binned matrix with TRAIN_REUSE_BINS (built
+# once per model type in each worker), else on X.iloc slices. Each finished
+# fold is appended to a JSON-lines cache keyed by the training data and the
+# trial's manifest key (full parameter set, thread count where it matters,
+# binning mode), and trials are sampled from SEED, so re-running an
+# interrupted search regenerates the same trials and only fits the folds
+# that are missing.
+
+
+def sample_trials(model_name, n_trials=TUNING_TRIALS, space=None, seed=SEED):
+    """
+    n_trials parameter dicts drawn from the model's search space.
+    """
+    space = space or SEARCH_SPACES[model_name]
+    rng = np.random.default_rng([seed, sorted(SEARCH_SPACES).index(model_name)])
+    trials = []
+    for _ in range(n_trials):
+        params = {}
+        for name, (kind, low, high) in space.items():
+            if kind == "int":
+                params[name] = int(rng.integers(low, high + 1))
+            elif kind == "log":
+                params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                params[name] = float(rng.uniform(low, high))
+        trials.append(params)
+    return trials
+
+
+def trial_key(model_name, params, n_threads, reuse_bins=TRAIN_REUSE_BINS):
+    """
+    Hash of everything a fold result depends on besides the data: the same
+    key a training fold with these parameters gets in the run manifest.
+    """
+    model = get_model(model_name, n_threads, tuned=False).set_params(**params)
+    return fold_params_hash(model_name, model, reuse_bins)
+
+
+def load_fold_cache(path):
+    """
+    {(trial key, fold): result} from a cache file; a torn last line is skipped.
+    """
+    results = {}
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[r["trial"], r["fold"]] = r
+    return results
+
+
+def _init_worker(X, y, splits, reuse_bins):
+    _WORKER_DATA["X"] = X
+    _WORKER_DATA["y"] = y
+    _WORKER_DATA["splits"] = splits
+    _WORKER_DATA["reuse_bins"] = reuse_bins
+
+
+def _run_trial_fold(model_name, key, params, fold, n_threads):
+    X, y = _WORKER_DATA["X"], _WORKER_DATA["y"]
+    train_idx, val_idx = _WORKER_DATA["splits"][fold - 1]
+    X_val, y_val = X.iloc[val_idx], y.iloc[val_idx]
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    model = get_model(model_name, n_threads, tuned=False).set_params(**params)
+    if _WORKER_DATA["reuse_bins"]:
+        # tuned parameters do not change the bin borders, so trials share them
+        if ("binned", model_name) not in _WORKER_DATA:
+            _WORKER_DATA["binned", model_name] = prepare_binned(model_name, model, X, y, reuse_bins=True)
+        model = fit_binned(model_name, model, _WORKER_DATA["binned", model_name], train_idx, val_idx)
+    else:
+        model.fit(X.iloc[train_idx], y.iloc[train_idx], **early_stopping_fit_params(model_name, model, X_val, y_val))
+    auc = roc_auc_score(y_val, positive_proba(model, X_val))
+
+    return {
+        "trial": key,
+        "fold": fold,
+        "auc": float(auc),
+        "best_iteration": int(best_iteration(model)),
+        "cpu_s": time.process_time() - cpu,
+        "wall_s": time.perf_counter() - wall,
+    }
+
+
+def successive_halving(model_name, trials, pool, workers, n_threads, cache_path, budget,
+                       reuse_bins=TRAIN_REUSE_BINS):
+    """
+    Runs the rungs for one model type. `budget` is a one-element list of
+    remaining CPU seconds shared across model types. Returns
+    [(mean AUC, folds scored, params, mean best iteration)] of the trials
+    alive at the last rung reached, best first.
+    """
+    keys = [trial_key(model_name, p, n_threads, reuse_bins) for p in trials]
+    results = load_fold_cache(cache_path)
+    cached = sum((k, f) in results for k in keys for f in range(1, CV_FOLDS + 1))
+    if cached:
+        logger.info(f"{model_name}: resuming with {cached} cached fold results")
+
+    alive = list(range(len(trials)))
+    ranked = []
+    for rung, n_folds in enumerate(TUNING_RUNGS):
+        jobs = [(i, fold) for i in alive for fold in range(1, n_folds + 1) if (keys[i], fold) not in results]
+
+        with span(f"{model_name}/rung{rung}", trials=len(alive), folds=n_folds, fits=len(jobs)), \
+                open(cache_path, "a") as cache:
+            pending = set()
+            while jobs or pending:
+                while jobs and len(pending) < workers and budget[0] > 0:
+                    i, fold = jobs.pop(0)
+                    pending.add(pool.submit(_run_trial_fold, model_name, keys[i], trials[i], fold, n_threads))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    r = future.result()
+                    results[r["trial"], r["fold"]] = r
+                    budget[0] -= r["cpu_s"]
+                    cache.write(json.dumps(r) + "\n")
+                    cache.flush()
+
+        # a trial missing a fold of this rung ran out of budget and is dropped
+        scored = []
+        for i in alive:
+            folds = [results.get((keys[i], f)) for f in range(1, n_folds + 1)]
+            if all(folds):
+                scored.append((np.mean([r["auc"] for r in folds]), i, np.mean([r["best_iteration"] for r in folds])))
+        if not scored:
+            break
+
+        scored.sort(key=lambda s: -s[0])
+        ranked = [(auc, n_folds, trials[i], it) for auc, i, it in scored]
+        logger.info(
+            f"{model_name} rung {rung}: {len(scored)}/{len(alive)} trials on {n_folds} folds, "
+            f"best mean AUC {scored[0][0]:.5f}"
+        )
+        if budget[0] <= 0:
+            logger.info(f"{model_name}: CPU budget spent after rung {rung}")
+            break
+        alive = [i for _, i, _ in scored[:max(1, len(scored) // TUNING_ETA)]]
+
+    return ranked
+
+
+def run_tuning(model_names=None, train_file=TRAIN_FILE, n_trials=TUNING_TRIALS,
+               cpu_budget_s=TUNING_CPU_BUDGET_S, path=TUNED_PARAMS_FILE, reuse_bins=TRAIN_REUSE_BINS):
+    """
+    Searches each model type's parameters and writes the winners to `path`
+    (merged with earlier winners of model types not searched now).
+    """
+    model_names = model_names or list(SEARCH_SPACES)
+    unknown = [name for name in model_names if name not in SEARCH_SPACES]
+    if unknown:
+        raise CustomException(f"No search space for {unknown}", sys)
+
+    logger.info("Loading training matrix with features...")
+    with span("load_train_matrix") as s:
+        X, y, _ = load_train_matrix(train_file)
+        s["rows"], s["features"] = X.shape
+    splits = get_cv_splits(X, y)
+    data_key = cache_key("train", train_file)
+    TUNING_DIR.mkdir(parents=True, exist_ok=True)
+
+    workers, n_threads = plan_cpu_budget(n_trials * CV_FOLDS)
+    budget = [cpu_budget_s]
+    tuned = json.loads(path.read_text()) if path.exists() else {}
+
+    # spawn: forking after the GBDT libraries load OpenMP can deadlock
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(X, y, splits, reuse_bins)) as pool:
+        for name in model_names:
+            trials = sample_trials(name, n_trials)
+            cache_path = TUNING_DIR / f"{data_key}-{name}.jsonl"
+            ranked = successive_halving(name, trials, pool, workers, n_threads, cache_path, budget, reuse_bins)
+            if not ranked:
+                logger.warning(f"{name}: no trial finished a rung within the CPU budget; keeping defaults")
+                continue
+
+            auc, n_folds, params, iterations = ranked[0]
+            tuned[name] = {"params": params, "cv_auc": auc, "folds": n_folds, "best_iteration": iterations}
+            logger.info(f"{name} best params (mean AUC {auc:.5f} on {n_folds} folds): {params}")
+
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(tuned, f, indent=2)
+    os.replace(tmp, path)
+    logger.info(f"Tuned parameters -> {path} ({cpu_budget_s - budget[0]:.0f} CPU seconds)")
+    return tuned
@@ -1,18 +1,18 @@
 import os
 import random
 import logging
-import numpy as np
 from src.exception import CustomException
 import sys
 
-import torch
-
 logger = logging.getLogger(__name__)
 
 def set_seed(seed :int):
+    import numpy as np
+
     random.seed(seed)
     np.random.seed(seed)
 
+    # torch is optional; seed it only when it is installed
     try:
         import torch
         torch.manual_seed(seed)
@@ -0,0 +1,51 @@
+"""
+Startup regression test: `python -m src.main --help` must stay fast and must
+not import the data or model libraries (see benchmarks/startup.py for the
+full report).
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ["pandas", "sklearn", "lightgbm", "xgboost", "catboost", "torch"]
+
+# Total import time of the best cold start, in seconds
+IMPORT_BUDGET_S = 0.5
+
+
+def importtime(module, *args):
+    """
+    {top-level package: cumulative import seconds} of one cold run.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", module, *args],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        depth = (len(name) - len(name.lstrip())) // 2
+        seconds = int(cumulative_us) / 1e6 if depth == 0 else 0.0  # nested ones count in their parent
+        packages[package] = packages.get(package, 0.0) + seconds
+    return packages
+
+
+def test_help_skips_heavy_imports():
+    packages = importtime("src.main", "--help")
+    leaked = sorted(set(packages) & set(HEAVY_MODULES))
+    assert not leaked, f"src.main --help imports {leaked}"
+
+
+def test_help_import_time():
+    best = min(sum(importtime("src.main", "--help").values()) for _ in range(3))
+    assert best < IMPORT_BUDGET_S, f"src.main --help spends {best:.3f}s importing (budget {IMPORT_BUDGET_S}s)"